@@ -0,0 +1,196 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import jsonify, current_app
+
+
+# Token bucket: nạp rate token/giây, chứa tối đa capacity token (cho phép burst)
+# take(max_wait): nếu chưa đủ token thì đặt trước token (số token âm) và chờ tới lượt, tối đa max_wait giây
+# -> request được dàn đều theo rate thay vì bị từ chối ngay; trả về số giây cần chờ nếu vượt max_wait
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, max_wait=0):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0
+            if wait > max_wait:
+                return wait
+            self.tokens -= 1
+        if wait > 0:
+            time.sleep(wait)
+        return None
+
+    # Trả lại token khi request bị từ chối ở bước sau (vd. giới hạn chung)
+    def refund(self):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+
+# Giới hạn cho 1 nhóm route: 1 bucket chung cho mọi user + 1 bucket riêng mỗi user (LRU tối đa max_users)
+# Vượt giới hạn riêng -> từ chối ngay; giới hạn chung -> chờ tối đa max_wait giây rồi mới từ chối
+class RateLimit:
+    def __init__(self, name, rate, burst, user_rate, user_burst, max_wait=0, max_users=10000):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst) if rate > 0 else None
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_wait = max_wait
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected_user = 0
+        self.rejected_global = 0
+        self.refunded = 0
+        self.waiting = 0
+
+    def _user_bucket(self, key):
+        with self._lock:
+            bucket = self._users.get(key)
+            if bucket is None:
+                bucket = self._users[key] = TokenBucket(self.user_rate, self.user_burst)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            self._users.move_to_end(key)
+            return bucket
+
+    # Trả về None nếu được phép, ngược lại (phạm vi bị chặn, số giây nên chờ trước khi thử lại)
+    def acquire(self, key):
+        user_bucket = self._user_bucket(key) if key is not None and self.user_rate > 0 else None
+        if user_bucket is not None:
+            retry_after = user_bucket.take()
+            if retry_after is not None:
+                self._count('rejected_user')
+                return 'user', retry_after
+        if self.bucket is not None:
+            self._count('waiting')
+            try:
+                retry_after = self.bucket.take(self.max_wait)
+            finally:
+                self._count('waiting', -1)
+            if retry_after is not None:
+                if user_bucket is not None:
+                    user_bucket.refund()
+                self._count('rejected_global')
+                return 'global', retry_after
+        self._count('allowed')
+        return None
+
+    # Request đã được cho qua nhưng bị từ chối ở handler (4xx: thiếu dữ liệu, sai id...) -> trả lại token,
+    # để request rác gửi kèm id của người khác không làm người đó hết lượt
+    def refund(self, key):
+        if key is not None:
+            with self._lock:
+                user_bucket = self._users.get(key)
+            if user_bucket is not None:
+                user_bucket.refund()
+        if self.bucket is not None:
+            self.bucket.refund()
+        self._count('refunded')
+
+    def _count(self, name, delta=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + delta)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'allowed': self.allowed,
+                'rejected_user': self.rejected_user,
+                'rejected_global': self.rejected_global,
+                'refunded': self.refunded,
+                'waiting': self.waiting,
+                'users': len(self._users),
+            }
+
+
+# Số bài được chấm cùng lúc trong request (GRADING_ASYNC=0); hết chỗ thì bài được đưa vào hàng đợi chấm sau
+class InflightLimit:
+    def __init__(self, limit=0):
+        self.limit = limit
+        self.inflight = 0
+        self.deferred = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout=0):
+        with self._cond:
+            if self.limit > 0 and not self._cond.wait_for(lambda: self.inflight < self.limit, timeout):
+                self.deferred += 1
+                return False
+            self.inflight += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self.inflight -= 1
+            self._cond.notify()
+
+
+# Kiểm soát tải lúc sát deadline: giới hạn tốc độ nộp bài/lưu nháp và số bài chấm đồng thời
+# Giới hạn tính theo từng process (chạy N worker gunicorn thì giới hạn chung thực tế là N x rate)
+class Admission:
+    def __init__(self):
+        self.enabled = True
+        self.limits = {}
+        self.grading = InflightLimit()
+        self.grading_wait = 0.5
+
+    def init_app(self, app):
+        config = app.config
+        self.enabled = config.get('RATE_LIMIT_ENABLED', True)
+        for name, prefix in (('submit', 'SUBMIT'), ('draft', 'DRAFT')):
+            self.limits[name] = RateLimit(
+                name,
+                rate=config[f'{prefix}_RATE'], burst=config[f'{prefix}_BURST'],
+                user_rate=config[f'{prefix}_USER_RATE'], user_burst=config[f'{prefix}_USER_BURST'],
+                max_wait=config[f'{prefix}_MAX_WAIT'],
+            )
+        self.grading = InflightLimit(config.get('GRADING_MAX_INFLIGHT', 0))
+        self.grading_wait = config.get('GRADING_SLOT_WAIT', self.grading_wait)
+
+    # key_func() -> id của người gửi (vd. student_id trong body), None = chỉ áp dụng giới hạn chung
+    def limit(self, name, key_func):
+        def decorator(f):
+            def wrapper(*args, **kwargs):
+                if not self.enabled or name not in self.limits:
+                    return f(*args, **kwargs)
+                limit = self.limits[name]
+                key = key_func()
+                rejected = limit.acquire(key)
+                if rejected is not None:
+                    scope, retry_after = rejected
+                    response = jsonify({'error': 'Too many requests', 'scope': scope,
+                                        'retry_after': round(retry_after, 2)})
+                    response.status_code = 429
+                    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+                    return response
+                response = current_app.make_response(f(*args, **kwargs))
+                if 400 <= response.status_code < 500:
+                    limit.refund(key)
+                return response
+            wrapper.__name__ = f.__name__
+            return wrapper
+        return decorator
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'limits': {name: limit.stats() for name, limit in self.limits.items()},
+            'grading_inflight': self.grading.inflight,
+            'grading_max_inflight': self.grading.limit,
+            'grading_deferred': self.grading.deferred,
+        }
+
+
+admission = Admission()
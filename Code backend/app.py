@@ -1,41 +1,384 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from models import db, User, Essay, Submission, Assignment, EssayDraft
-from grading import grade_essay
+from models import db, User, Essay, Submission, Assignment, EssayDraft, GradingResult
+from grading import grade_essay, grade_essays, invalidate_criteria, SPACY_MODEL
+from criteria_engine import CriteriaError, ENGINE_VERSION
+from criteria_schema import set_essay_criteria
+from grading_queue import GradingQueue
+from result_cache import result_cache, SQLResultStore
+from migrations import upgrade_schema
+from instrumentation import init_query_counter
+from metrics import init_metrics, registry, stage
+from pagination import list_response
+from db_config import engine_options, init_sqlite_pragmas
+from auth import role_cache, issue_token, verify_token, DEV_SECRET_KEY
+from draft_buffer import draft_buffer, DraftConflict, DraftPatchError
+from bulk_io import (detect_format, read_rows, import_submissions, export_query, export_csv,
+                     export_parquet, parquet_available, BulkImportError, EXPORT_FORMATS)
+from similarity import similarity_index
+from response_cache import response_cache
+from admission import admission
+from score_stats import (submission_scores, record_score_change, set_submission_scores, rebuild_essay_stats,
+                         delete_essay_stats, read_essay_stats)
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy import or_
 import os
 from werkzeug.security import generate_password_hash, check_password_hash
+import atexit
 import json
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 
 app = Flask(__name__)
 CORS(app)
 
-# Config SQLite
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///essay_grading.db'
+# Config database (mặc định SQLite; đặt DATABASE_URL=postgresql://... để dùng server DB)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///essay_grading.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# SQLite: WAL + busy timeout để các request ghi đồng thời chờ nhau thay vì lỗi "database is locked"
+app.config['SQLITE_JOURNAL_MODE'] = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+app.config['SQLITE_BUSY_TIMEOUT'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 15000))  # ms
+# Server DB: connection pool
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 10))
+app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+app.config['DB_POOL_PRE_PING'] = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+# Config hàng đợi chấm điểm
+app.config['GRADING_ASYNC'] = os.environ.get('GRADING_ASYNC', '1') == '1'
+app.config['GRADING_WORKERS'] = int(os.environ.get('GRADING_WORKERS', 2))
+app.config['GRADING_MAX_RETRIES'] = int(os.environ.get('GRADING_MAX_RETRIES', 2))
+# Worker khởi động sau (recycle, bị kill) chỉ chấm lại bài chờ chấm quá số giây này (xem recover_pending_grading)
+app.config['GRADING_RECOVER_AGE'] = float(os.environ.get('GRADING_RECOVER_AGE', 300))
+app.config['REGRADE_BATCH_SIZE'] = int(os.environ.get('REGRADE_BATCH_SIZE', 64))
+app.config['REGRADE_N_PROCESS'] = int(os.environ.get('REGRADE_N_PROCESS', 1))
+app.config['REGRADE_CHUNK_SIZE'] = int(os.environ.get('REGRADE_CHUNK_SIZE', 500))
+# Config cache kết quả chấm (theo hash nội dung + hash tiêu chí)
+app.config['GRADING_CACHE_SIZE'] = int(os.environ.get('GRADING_CACHE_SIZE', 10000))
+app.config['GRADING_CACHE_PERSIST'] = os.environ.get('GRADING_CACHE_PERSIST', '0') == '1'
+app.config['GRADING_CACHE_PERSIST_MAX_ROWS'] = int(os.environ.get('GRADING_CACHE_PERSIST_MAX_ROWS', 100000))
+# Config xác thực: token phiên ký bằng SECRET_KEY, cache role theo user id
+app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', DEV_SECRET_KEY)
+app.config['AUTH_TOKEN_MAX_AGE'] = int(os.environ.get('AUTH_TOKEN_MAX_AGE', 12 * 3600))  # giây
+app.config['AUTH_ROLE_CACHE_TTL'] = float(os.environ.get('AUTH_ROLE_CACHE_TTL', 60))  # 0 = tắt cache
+app.config['AUTH_ELEVATED_ROLE_CACHE_TTL'] = float(os.environ.get('AUTH_ELEVATED_ROLE_CACHE_TTL', 5))  # role khác student
+app.config['AUTH_REQUIRE_TOKEN'] = os.environ.get('AUTH_REQUIRE_TOKEN', '0') == '1'
+# Phát hiện bài giống nhau: số từ mỗi shingle, ngưỡng cosine mặc định, số đề giữ index trong bộ nhớ
+app.config['SIMILARITY_SHINGLE_SIZE'] = int(os.environ.get('SIMILARITY_SHINGLE_SIZE', 3))
+app.config['SIMILARITY_THRESHOLD'] = float(os.environ.get('SIMILARITY_THRESHOLD', 0.5))
+app.config['SIMILARITY_MAX_ESSAYS'] = int(os.environ.get('SIMILARITY_MAX_ESSAYS', 50))
+# Số dòng mỗi batch khi import bài nộp hàng loạt (chấm + insert + commit theo batch)
+app.config['IMPORT_BATCH_SIZE'] = int(os.environ.get('IMPORT_BATCH_SIZE', 500))
+# Ngưỡng điểm đạt (số nguyên) cho pass_rate ở /essays/<id>/stats
+app.config['STATS_PASS_SCORE'] = int(os.environ.get('STATS_PASS_SCORE', 5))
+# Profiler cho request chậm: PROFILE_SLOW_MS > 0 bật, ghi pstats vào PROFILE_DIR (xem metrics.py)
+app.config['PROFILE_SLOW_MS'] = float(os.environ.get('PROFILE_SLOW_MS', 0))
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 1.0))
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', 'profiles')
+# Cache response của các endpoint đọc (đề, danh sách đề, bài được giao), kèm ETag/304
+app.config['RESPONSE_CACHE_ENABLED'] = os.environ.get('RESPONSE_CACHE_ENABLED', '1') == '1'
+app.config['RESPONSE_CACHE_TTL'] = float(os.environ.get('RESPONSE_CACHE_TTL', 60))  # giây
+app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', 1000))  # số entry
+app.config['RESPONSE_CACHE_MAX_BYTES'] = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+# Để trống = cache trong bộ nhớ từng process; redis://... = dùng chung giữa các worker (cần package redis)
+app.config['RESPONSE_CACHE_URL'] = os.environ.get('RESPONSE_CACHE_URL', '')
+# Giới hạn tốc độ lúc sát deadline (token bucket, theo từng process): *_RATE/*_BURST là giới hạn chung (request/giây,
+# số request dồn tối đa), *_USER_RATE/*_USER_BURST cho từng học sinh; hết token chung thì chờ tối đa *_MAX_WAIT giây
+app.config['RATE_LIMIT_ENABLED'] = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+app.config['SUBMIT_RATE'] = float(os.environ.get('SUBMIT_RATE', 50))
+app.config['SUBMIT_BURST'] = float(os.environ.get('SUBMIT_BURST', 200))
+app.config['SUBMIT_USER_RATE'] = float(os.environ.get('SUBMIT_USER_RATE', 0.2))
+app.config['SUBMIT_USER_BURST'] = float(os.environ.get('SUBMIT_USER_BURST', 3))
+app.config['SUBMIT_MAX_WAIT'] = float(os.environ.get('SUBMIT_MAX_WAIT', 10))
+app.config['DRAFT_RATE'] = float(os.environ.get('DRAFT_RATE', 100))
+app.config['DRAFT_BURST'] = float(os.environ.get('DRAFT_BURST', 200))
+app.config['DRAFT_USER_RATE'] = float(os.environ.get('DRAFT_USER_RATE', 1))
+app.config['DRAFT_USER_BURST'] = float(os.environ.get('DRAFT_USER_BURST', 5))
+app.config['DRAFT_MAX_WAIT'] = float(os.environ.get('DRAFT_MAX_WAIT', 0))
+# Số bài chấm đồng thời trong request khi GRADING_ASYNC=0 (0 = không giới hạn); hết chỗ sau GRADING_SLOT_WAIT giây
+# thì bài đã lưu được chuyển sang hàng đợi chấm sau (trả về 202)
+app.config['GRADING_MAX_INFLIGHT'] = int(os.environ.get('GRADING_MAX_INFLIGHT', os.cpu_count() or 1))
+app.config['GRADING_SLOT_WAIT'] = float(os.environ.get('GRADING_SLOT_WAIT', 0.5))
+# Chu kỳ (giây) ghi bản nháp từ bộ nhớ xuống DB; 0 = ghi ngay mỗi lần lưu
+app.config['DRAFT_FLUSH_INTERVAL'] = float(os.environ.get('DRAFT_FLUSH_INTERVAL', 5))
 
 db.init_app(app)
+init_sqlite_pragmas(app, db)
 
 with app.app_context():
     db.create_all()
+    upgrade_schema(db.engine)
+
+init_query_counter(app, db)
+init_metrics(app, db)
+
+result_cache.configure(
+    maxsize=app.config['GRADING_CACHE_SIZE'],
+    store=SQLResultStore(db, GradingResult, f'{ENGINE_VERSION}/{SPACY_MODEL}',
+                         max_rows=app.config['GRADING_CACHE_PERSIST_MAX_ROWS'])
+    if app.config['GRADING_CACHE_PERSIST'] else None,
+)
+
+# Chấm 1 bài nộp và lưu kết quả (worker của hàng đợi gọi hàm này)
+def grade_submission(submission_id):
+    with stage('load'):
+        submission = Submission.query.get(submission_id)
+        essay = Essay.query.get(submission.essay_id) if submission else None
+    if not submission:
+        return None
+    score, reasons = grade_essay(submission.content, essay.criteria, essay.id, essay.criteria_hash)
+    set_submission_scores(db.session, submission, suggested_score=score, grading_pending=False,
+                          auto_feedback="; ".join(reasons) if reasons else "Good job!")
+    with stage('commit'):
+        db.session.commit()
+    return score, reasons
+
+# Job của bài chờ chấm được đưa lại vào hàng đợi: process khác đã chấm xong thì bỏ qua
+def grade_pending_submission(submission_id):
+    submission = Submission.query.get(submission_id)
+    if submission is None or not submission.grading_pending:
+        return None
+    return grade_submission(submission_id)
+
+# Bài đã lưu nhưng chưa chấm xong khi process trước dừng (crash/restart làm mất hàng đợi trong bộ nhớ)
+# -> đưa lại vào hàng đợi. min_age > 0: chỉ lấy bài nhận từ min_age giây trước, bài mới hơn có thể
+# vẫn đang nằm trong hàng đợi của worker khác. Cần app context
+def recover_pending_grading(min_age=0):
+    query = db.session.query(Submission.id).filter(Submission.grading_pending.is_(True))
+    if min_age > 0:
+        query = query.filter(Submission.submitted_at <= datetime.utcnow() - timedelta(seconds=min_age))
+    ids = [row.id for row in query.order_by(Submission.id)]
+    for submission_id in ids:
+        grading_queue.submit(grade_pending_submission, submission_id, kind='grade', submission_id=submission_id,
+                             recovered=True)
+    return len(ids)
+
+# Chấm lại toàn bộ bài nộp của 1 đề: đọc theo từng chunk id, chấm qua nlp.pipe, ghi bulk update
+def regrade_essay(essay_id, batch_size, n_process, chunk_size):
+    essay = Essay.query.get(essay_id)
+    if not essay:
+        return None
+    ids = [row.id for row in db.session.query(Submission.id).filter_by(essay_id=essay_id).order_by(Submission.id)]
+    total = len(ids)
+    start = time.perf_counter()
+
+    # Bài giáo viên đã chấm (có final_score): feedback là nhận xét của giáo viên -> chỉ cập nhật điểm gợi ý
+    reviewed = set()
+
+    def items():
+        for i in range(0, total, chunk_size):
+            chunk_ids = ids[i:i + chunk_size]
+            rows = db.session.query(Submission.id, Submission.content, Submission.final_score).filter(
+                Submission.id.in_(chunk_ids)).all()
+            contents = {row.id: row.content for row in rows}
+            reviewed.update(row.id for row in rows if row.final_score is not None)
+            for sid in chunk_ids:
+                if sid in contents:
+                    yield contents[sid], sid
+
+    def progress(processed):
+        elapsed = time.perf_counter() - start
+        stats = {
+            'processed': processed,
+            'total': total,
+            'elapsed_seconds': round(elapsed, 3),
+            'submissions_per_second': round(processed / elapsed, 1) if elapsed > 0 else None,
+        }
+        grading_queue.report_progress(**stats)
+        return stats
+
+    updates = []
+    processed = 0
+    for sid, score, reasons in grade_essays(items(), essay.criteria, batch_size=batch_size, n_process=n_process,
+                                            essay_id=essay_id, criteria_hash=essay.criteria_hash):
+        row = {'id': sid, 'suggested_score': score, 'grading_pending': False}
+        if sid not in reviewed:
+            row['feedback'] = "; ".join(reasons) if reasons else "Good job!"
+        updates.append(row)
+        if len(updates) >= chunk_size:
+            write_regrade_updates(updates)
+            processed += len(updates)
+            updates = []
+            progress(processed)
+    if updates:
+        write_regrade_updates(updates)
+        processed += len(updates)
+    # Bulk update không đi qua record_score_change -> tính lại thống kê 1 lần (đằng nào cũng đã đọc hết bài)
+    rebuild_essay_stats(db.session, essay_id)
+    db.session.commit()
+    return progress(processed)
+
+# Bulk update theo id; bài có và không có feedback ghi riêng 2 nhóm (mỗi câu UPDATE cùng 1 bộ cột)
+def write_regrade_updates(updates):
+    for group in ([u for u in updates if 'feedback' in u], [u for u in updates if 'feedback' not in u]):
+        if group:
+            db.session.execute(db.update(Submission), group)
+    db.session.commit()
+
+# Bài nộp của 1 đề có id > after_id (để index độ giống đọc thêm bài mới)
+def load_submission_texts(essay_id, after_id, edited_since):
+    changed = Submission.id > after_id
+    if edited_since is None:
+        changed = or_(changed, Submission.edited_at.isnot(None))
+    else:
+        changed = or_(changed, Submission.edited_at > edited_since)
+    return db.session.query(Submission.id, Submission.student_id, Submission.content, Submission.edited_at).filter(
+        Submission.essay_id == essay_id, changed
+    ).order_by(Submission.id).yield_per(500)
+
+similarity_index.init_app(app, load_submission_texts)
+
+grading_queue = GradingQueue()
+grading_queue.init_app(app, grade_submission)
+
+draft_buffer.init_app(app)
+response_cache.init_app(app)
+admission.init_app(app)
+role_cache.ttl = app.config['AUTH_ROLE_CACHE_TTL']
+role_cache.elevated_ttl = app.config['AUTH_ELEVATED_ROLE_CACHE_TTL']
+# Token chỉ an toàn khi đặt SECRET_KEY riêng và AUTH_REQUIRE_TOKEN=1 (không thì gửi user_id là đủ)
+if app.config['SECRET_KEY'] == DEV_SECRET_KEY:
+    app.logger.warning('SECRET_KEY is not set: session tokens are signed with a public default key')
+if not app.config['AUTH_REQUIRE_TOKEN']:
+    app.logger.warning('AUTH_REQUIRE_TOKEN is off: requests can act as any user_id without a token')
+registry.gauge('grading_queue_pending', grading_queue.pending, 'Grading jobs queued or running')
+registry.counter('grading_cache_hits_total', lambda: result_cache.hits + result_cache.store_hits,
+                 'Grading result cache hits')
+registry.counter('grading_cache_misses_total', lambda: result_cache.misses, 'Grading result cache misses')
+registry.gauge('grading_queue_depth', grading_queue.depth, 'Grading jobs waiting for a worker')
+registry.gauge('grading_queue_running', lambda: grading_queue.running, 'Grading jobs running in queue workers')
+registry.gauge('grading_inflight', lambda: admission.grading.inflight, 'Submissions being graded inside requests')
+registry.counter('grading_deferred_total', lambda: admission.grading.deferred,
+                 'Submissions deferred to the queue (no grading slot)')
+registry.gauge('rate_limit_waiting', lambda: sum(l.waiting for l in admission.limits.values()),
+               'Requests waiting for a global rate limit token')
+registry.counter('rate_limit_rejected_total',
+                 lambda: sum(l.rejected_user + l.rejected_global for l in admission.limits.values()),
+                 'Requests rejected with 429')
+registry.counter('response_cache_hits_total', lambda: response_cache.hits, 'Response cache hits')
+registry.counter('response_cache_misses_total', lambda: response_cache.misses, 'Response cache misses')
+registry.counter('response_cache_not_modified_total', lambda: response_cache.not_modified,
+                 '304 responses from response cache')
+# Tắt server bình thường (Ctrl+C, SIGTERM) -> ghi hết nháp còn trong bộ nhớ
+atexit.register(draft_buffer.shutdown)
+
+# Thời điểm nhận request, trước khi chờ giới hạn tốc độ (dùng làm thời điểm nộp bài)
+@app.before_request
+def mark_received():
+    g.received_at = datetime.utcnow()
+
+# Key giới hạn tốc độ theo học sinh: user id trong token nếu request có token hợp lệ,
+# không thì student_id trong body, không có nữa thì theo IP
+def submitter_key():
+    if request.headers.get('Authorization', '').startswith('Bearer '):
+        user_id, _ = request_user_id()
+        if user_id is not None:
+            return f'user:{user_id}'
+    data = request.get_json(silent=True) or {}
+    student_id = data.get('student_id')
+    return str(student_id) if student_id is not None else request.remote_addr
+
+# Lấy user id của request: ưu tiên header "Authorization: Bearer <token>" (cấp khi login),
+# nếu không có thì dùng user_id trong body/query như cũ (trừ khi AUTH_REQUIRE_TOKEN=1)
+# Trả về (user_id, lỗi)
+def request_user_id():
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        user_id = verify_token(app, auth_header[len('Bearer '):])
+        if user_id is None:
+            return None, 'Invalid or expired token'
+        return user_id, None
+    if app.config['AUTH_REQUIRE_TOKEN']:
+        return None, 'Missing token'
+    if request.method in ['POST', 'PUT', 'PATCH', 'DELETE']:
+        data = request.get_json(silent=True) or {}
+        user_id = data.get('user_id')
+    else:
+        user_id = request.args.get('user_id')
+    try:
+        return int(user_id), None
+    except (TypeError, ValueError):
+        return None, None
+
+# Role của user: lấy từ cache, chỉ query DB khi cache miss/hết hạn
+def user_role(user_id):
+    role = role_cache.get(user_id)
+    if role is None:
+        user = User.query.get(user_id)
+        if not user:
+            return None
+        role = user.role
+        role_cache.set(user_id, role)
+    return role
 
 def require_role(*roles):
     def decorator(f):
         def wrapper(*args, **kwargs):
-            if request.method in ['POST', 'PUT', 'PATCH', 'DELETE']:
-                data = request.get_json(silent=True) or {}
-                user_id = data.get('user_id')
-            else:
-                user_id = request.args.get('user_id')
-            user = User.query.get(user_id)
-            if not user or user.role not in roles:
+            user_id, error = request_user_id()
+            if error:
+                return jsonify({'error': error}), 401
+            role = user_role(user_id) if user_id is not None else None
+            if role not in roles:
                 return jsonify({'error': 'Permission denied'}), 403
+            g.user_id = user_id
             return f(*args, **kwargs)
         wrapper.__name__ = f.__name__
         return wrapper
     return decorator
 
+# Các field trả về cho danh sách (dùng cho fields= và phân trang, xem pagination.py)
+SUBMISSION_FIELDS = {
+    'id': Submission.id,
+    'essay_id': Submission.essay_id,
+    'student_id': Submission.student_id,
+    'student_name': User.username,
+    'content': Submission.content,
+    'suggested_score': Submission.suggested_score,
+    'final_score': Submission.final_score,
+    'feedback': Submission.feedback,
+    'submitted_at': Submission.submitted_at,
+}
+ASSIGNMENT_FIELDS = {
+    'id': Assignment.id,
+    'essay_id': Assignment.essay_id,
+    'question': Essay.question,
+    'teacher_id': Assignment.teacher_id,
+    'teacher_name': User.username,
+}
+ESSAY_FIELDS = {
+    'id': Essay.id,
+    'question': Essay.question,
+    'criteria': Essay.criteria,
+    'criteria_version': Essay.criteria_version,
+    'criteria_hash': Essay.criteria_hash,
+    'teacher_id': Essay.teacher_id,
+}
+USER_FIELDS = {
+    'id': User.id,
+    'username': User.username,
+    'role': User.role,
+}
+
+def all_columns(fields):
+    return [column.label(name) for name, column in fields.items()]
+
+# Danh sách bài nộp kèm tên học sinh trong 1 câu query (join thay vì lazy load từng dòng)
+def submission_rows(*filters, columns=None):
+    return db.session.query(*(columns or all_columns(SUBMISSION_FIELDS))).outerjoin(
+        User, Submission.student_id == User.id
+    ).filter(*filters)
+
+# Danh sách assignment kèm câu hỏi và tên giáo viên trong 1 câu query
+def assignment_rows(*filters, columns=None):
+    return db.session.query(*(columns or all_columns(ASSIGNMENT_FIELDS))).outerjoin(
+        Essay, Assignment.essay_id == Essay.id
+    ).outerjoin(
+        User, Assignment.teacher_id == User.id
+    ).filter(*filters)
+
 # Đăng ký
 @app.route('/register', methods=['POST'])
 def register():
@@ -59,7 +402,13 @@ def login():
     data = request.json
     user = User.query.filter_by(username=data['username']).first()
     if user and check_password_hash(user.password, data['password']):
-        return jsonify({'id': user.id, 'username': user.username, 'role': user.role})
+        role_cache.set(user.id, user.role)
+        return jsonify({
+            'id': user.id,
+            'username': user.username,
+            'role': user.role,
+            'token': issue_token(app, user.id)
+        })
     return jsonify({'error': 'Invalid login information'}), 401
 
 # CRUD ngân hàng đề cho exam_creator và teacher
@@ -67,73 +416,77 @@ def login():
 @require_role('exam_creator', 'teacher')
 def create_essay():
     data = request.json
-    def normalize_criteria(criteria):
-        new_criteria = []
-        for c in criteria:
-            ctype = c.get('type')
-            deduct = float(c.get('deduct', 0.5))
-            if ctype == 'contains':
-                phrase = c.get('phrase') or c.get('value')
-                new_criteria.append({'type': 'contains', 'phrase': phrase, 'deduct': deduct})
-            elif ctype == 'min_words':
-                count = c.get('count') or c.get('value')
-                try:
-                    count = int(count)
-                except:
-                    count = 0
-                new_criteria.append({'type': 'min_words', 'count': count, 'deduct': deduct})
-            elif ctype == 'has_calculation':
-                new_criteria.append({'type': 'has_calculation', 'deduct': deduct})
-            else:
-                new_criteria.append(c)
-        return new_criteria
-    norm_criteria = normalize_criteria(data['criteria'])
     essay = Essay(
         question=data['question'],
-        criteria=json.dumps(norm_criteria),
-        teacher_id=data['user_id'] # id của người tạo (exam_creator hoặc teacher)
+        teacher_id=g.user_id # id của người tạo (exam_creator hoặc teacher)
     )
+    try:
+        set_essay_criteria(essay, data['criteria'])
+    except CriteriaError as e:
+        return jsonify({'error': str(e)}), 400
     db.session.add(essay)
+    db.session.flush()
+    rebuild_essay_stats(db.session, essay.id)
     db.session.commit()
+    response_cache.invalidate('essays')
     return jsonify({'message': 'Essay created successfully', 'essay_id': essay.id})
 
 # Lấy danh sách bài luận
 @app.route('/essays', methods=['GET'])
+@response_cache.cached('essays')
 def list_essays():
-    essays = Essay.query.all()
-    return jsonify([
-        {'id': e.id, 'question': e.question, 'criteria': json.loads(e.criteria), 'teacher_id': e.teacher_id}
-        for e in essays
-    ])
+    return list_response(
+        lambda columns: db.session.query(*columns),
+        ESSAY_FIELDS, Essay.id, raw_json=('criteria',)
+    )
 
 # Lưu nháp bài luận
+# Body: {student_id, content} hoặc {student_id, base_version, patches: [{start, end, text}]}
+# Nháp được gộp trong bộ nhớ và ghi xuống DB theo chu kỳ DRAFT_FLUSH_INTERVAL
 @app.route('/essays/<int:essay_id>/drafts', methods=['POST'])
+@admission.limit('draft', submitter_key)
 def save_draft(essay_id):
     data = request.json
-    if not data or not all(k in data for k in ('student_id', 'content')):
+    if not data or 'student_id' not in data or not ('content' in data or 'patches' in data):
         return jsonify({'error': 'Missing information'}), 400
-    draft = EssayDraft.query.filter_by(essay_id=essay_id, student_id=data['student_id']).first()
-    if not draft:
-        draft = EssayDraft(essay_id=essay_id, student_id=data['student_id'])
-        db.session.add(draft)
-    draft.content = data['content']
-    draft.last_saved = datetime.utcnow()
-    db.session.commit()
-    return jsonify({'message': 'Draft saved', 'draft_id': draft.id, 'last_saved': draft.last_saved.isoformat()})
+    try:
+        try:
+            draft = draft_buffer.save(essay_id, data['student_id'], content=data.get('content'),
+                                      patches=data.get('patches'), base_version=data.get('base_version'))
+        except IntegrityError:
+            # 2 request tạo nháp cùng lúc: bản nháp đã được tạo bởi request kia -> lưu lại đè lên bản đó
+            current = draft_buffer.get(essay_id, data['student_id'])
+            draft = draft_buffer.save(essay_id, data['student_id'], content=current['content'])
+    except DraftConflict as e:
+        return jsonify({'error': 'Draft version conflict', 'version': e.version}), 409
+    except (DraftPatchError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'message': 'Draft saved',
+        'draft_id': draft['id'],
+        'version': draft['version'],
+        'last_saved': draft['last_saved'].isoformat()
+    })
 
 # Lấy nháp bài luận
 @app.route('/essays/<int:essay_id>/drafts', methods=['GET'])
 def get_draft(essay_id):
     student_id = request.args.get('student_id')
-    draft = EssayDraft.query.filter_by(essay_id=essay_id, student_id=student_id).first()
+    draft = draft_buffer.get(essay_id, student_id)
     if not draft:
         return jsonify({})
-    return jsonify({'draft_id': draft.id, 'content': draft.content, 'last_saved': draft.last_saved.isoformat()})
+    return jsonify({
+        'draft_id': draft['id'],
+        'content': draft['content'],
+        'version': draft['version'],
+        'last_saved': draft['last_saved'].isoformat()
+    })
 
 # Xóa nháp bài luận
 @app.route('/essays/<int:essay_id>/drafts', methods=['DELETE'])
 def delete_draft(essay_id):
     student_id = request.args.get('student_id')
+    draft_buffer.discard(essay_id, student_id)
     draft = EssayDraft.query.filter_by(essay_id=essay_id, student_id=student_id).first()
     if draft:
         db.session.delete(draft)
@@ -141,45 +494,100 @@ def delete_draft(essay_id):
     return jsonify({'message': 'Draft deleted'})
 
 # Nộp bài (student) - tự động chấm điểm khi nộp, kiểm tra deadline
+# Deadline so với thời điểm nhận request (g.received_at), nên bài phải chờ giới hạn tốc độ lúc cao điểm vẫn hợp lệ
 @app.route('/essays/<int:essay_id>/submissions', methods=['POST'])
+@admission.limit('submit', submitter_key)
 def submit_essay(essay_id):
     data = request.json
     if not data or not all(k in data for k in ('student_id', 'content')):
         return jsonify({'error': 'Missing information'}), 400
+    received_at = g.get('received_at') or datetime.utcnow()
     # Kiểm tra deadline (nếu có assignment)
     assignment = Assignment.query.filter_by(essay_id=essay_id).first()
     if assignment and assignment.deadline:
-        if datetime.utcnow() > assignment.deadline:
+        if received_at > assignment.deadline:
             return jsonify({'error': 'Submission is past the deadline'}), 400
-    # Tự động grading
     essay = Essay.query.get(essay_id)
-    score, reasons = grade_essay(data['content'], essay.criteria)
-    auto_feedback = "; ".join(reasons) if reasons else "Good job!"
+    if not essay:
+        return jsonify({'error': 'Essay not found'}), 404
     submission = Submission(
         essay_id=essay_id,
         student_id=data['student_id'],
         content=data['content'],
-        suggested_score=score,
+        suggested_score=None,
         final_score=None,
         feedback=None,
+        submitted_at=received_at,
+        grading_pending=True,
     )
-    submission.feedback = auto_feedback
+    # Bỏ nháp trong bộ nhớ trước khi mở transaction ghi: discard chờ flush nháp đang chạy, flush lại chờ
+    # quyền ghi DB -> gọi sau INSERT thì 2 bên chờ nhau tới hết busy timeout
+    draft_buffer.discard(essay_id, data['student_id'])
     db.session.add(submission)
+    db.session.flush()
+    record_score_change(db.session, essay_id, None, submission_scores(submission))
     # Xóa nháp nếu có
     draft = EssayDraft.query.filter_by(essay_id=essay_id, student_id=data['student_id']).first()
     if draft:
         db.session.delete(draft)
     db.session.commit()
+    similarity_index.add(essay_id, submission.id, submission.student_id, submission.content)
+    # Chấm trong request nếu còn chỗ (GRADING_MAX_INFLIGHT); DB bận quá busy timeout lúc cao điểm thì bài
+    # đã lưu nên chỉ cần chuyển sang hàng đợi (có retry) thay vì trả lỗi
+    graded = None
+    if not app.config['GRADING_ASYNC'] and admission.grading.acquire(app.config['GRADING_SLOT_WAIT']):
+        try:
+            graded = grade_submission(submission.id)
+        except OperationalError:
+            db.session.rollback()
+        finally:
+            admission.grading.release()
+    # Chấm bất đồng bộ / hết chỗ chấm: trả về job_id ngay, worker sẽ điền suggested_score/feedback
+    if graded is None:
+        job_id = grading_queue.enqueue(submission.id)
+        return jsonify({
+            'message': 'Submission successful',
+            'submission_id': submission.id,
+            'submitted_at': received_at.isoformat(),
+            'job_id': job_id,
+            'status': 'queued',
+            'suggested_score': None,
+            'reasons': [],
+            'auto_feedback': None
+        }), 202
+    score, reasons = graded
+    auto_feedback = "; ".join(reasons) if reasons else "Good job!"
     return jsonify({
         'message': 'Submission successful',
         'submission_id': submission.id,
+        'submitted_at': received_at.isoformat(),
         'suggested_score': score,
         'reasons': reasons,
         'auto_feedback': auto_feedback
     })
 
+# Trạng thái job chấm điểm
+@app.route('/grading/jobs/<job_id>', methods=['GET'])
+def grading_job_status(job_id):
+    job = grading_queue.status(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+# Thống kê giới hạn tốc độ + số bài đang chấm/chờ chấm
+@app.route('/admission', methods=['GET'])
+def admission_stats():
+    return jsonify({**admission.stats(), 'grading_queue_depth': grading_queue.depth(),
+                    'grading_queue_running': grading_queue.running})
+
+# Thống kê cache kết quả chấm (hit/miss)
+@app.route('/grading/cache', methods=['GET'])
+def grading_cache_stats():
+    return jsonify(result_cache.stats())
+
 # Lấy chi tiết 1 đề
 @app.route('/essays/<int:essay_id>', methods=['GET'])
+@response_cache.cached('essay:{essay_id}')
 def get_essay(essay_id):
     essay = Essay.query.get(essay_id)
     if not essay:
@@ -188,6 +596,8 @@ def get_essay(essay_id):
         'id': essay.id,
         'question': essay.question,
         'criteria': json.loads(essay.criteria),
+        'criteria_version': essay.criteria_version,
+        'criteria_hash': essay.criteria_hash,
         'teacher_id': essay.teacher_id
     })
 
@@ -196,33 +606,71 @@ def get_essay(essay_id):
 def list_submissions(essay_id):
     student_id = request.args.get('student_id')
     if student_id:
-        submission = Submission.query.filter_by(essay_id=essay_id, student_id=student_id).first()
+        submission = submission_rows(Submission.essay_id == essay_id, Submission.student_id == student_id).first()
         if not submission:
             return jsonify({})
         return jsonify({
             'id': submission.id,
             'essay_id': submission.essay_id,
             'student_id': submission.student_id,
-            'student_name': submission.student.username,
+            'student_name': submission.student_name,
             'content': submission.content,
             'suggested_score': submission.suggested_score,
             'final_score': submission.final_score,
-            'feedback': submission.feedback
+            'feedback': submission.feedback,
+            'submitted_at': submission.submitted_at.isoformat() if submission.submitted_at else None
         })
-    # Nếu không có student_id, trả về tất cả bài nộp như cũ
-    submissions = Submission.query.filter_by(essay_id=essay_id).all()
-    return jsonify([
-        {
-            'id': s.id,
-            'student_id': s.student_id,
-            'student_name': s.student.username,
-            'content': s.content,
-            'suggested_score': s.suggested_score,
-            'final_score': s.final_score,
-            'feedback': s.feedback
-        }
-        for s in submissions
-    ])
+    # Nếu không có student_id, trả về tất cả bài nộp (hỗ trợ fields=, limit/cursor, format=ndjson)
+    return list_response(
+        lambda columns: submission_rows(Submission.essay_id == essay_id, columns=columns),
+        SUBMISSION_FIELDS, Submission.id, transforms={'submitted_at': datetime.isoformat}
+    )
+
+# Import hàng loạt bài nộp (CSV/JSONL, mỗi dòng có content + student_id hoặc username)
+# Gửi file qua multipart (field "file") hoặc gửi thẳng nội dung file làm body; ?grade=0 để không chấm
+@app.route('/essays/<int:essay_id>/submissions/import', methods=['POST'])
+@require_role('exam_creator', 'teacher')
+def import_essay_submissions(essay_id):
+    essay = Essay.query.get(essay_id)
+    if not essay:
+        return jsonify({'error': 'Essay not found'}), 404
+    upload = request.files.get('file')
+    try:
+        if upload:
+            fmt = detect_format(request.args.get('format'), upload.filename, upload.mimetype)
+            stream = upload.stream
+        else:
+            fmt = detect_format(request.args.get('format'), content_type=request.content_type)
+            stream = request.stream
+        batch_size = int(request.args.get('batch_size', app.config['IMPORT_BATCH_SIZE']))
+    except (BulkImportError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    if batch_size < 1:
+        return jsonify({'error': 'Invalid batch_size'}), 400
+    result = import_submissions(essay, read_rows(stream, fmt), batch_size=batch_size,
+                                grade=request.args.get('grade', '1') != '0',
+                                nlp_batch_size=app.config['REGRADE_BATCH_SIZE'])
+    return jsonify({'message': 'Import finished', **result})
+
+# Xuất điểm + nhận xét của mọi bài nộp (không gồm nội dung bài), stream từng chunk: ?format=csv|parquet
+@app.route('/essays/<int:essay_id>/submissions/export', methods=['GET'])
+@require_role('exam_creator', 'teacher')
+def export_essay_submissions(essay_id):
+    if not Essay.query.get(essay_id):
+        return jsonify({'error': 'Essay not found'}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported export format: {fmt}'}), 400
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({'error': 'Parquet export requires pyarrow (pip install pyarrow)'}), 501
+    query = export_query(essay_id)
+    if fmt == 'csv':
+        body, mimetype = export_csv(query), 'text/csv'
+    else:
+        body, mimetype = export_parquet(query), 'application/vnd.apache.parquet'
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=essay_{essay_id}_submissions.{fmt}'
+    return response
 
 # Cập nhật bài nộp (cho phép sửa bài)
 @app.route('/submissions/<int:submission_id>', methods=['PUT'])
@@ -231,8 +679,11 @@ def update_submission(submission_id):
     submission = Submission.query.get(submission_id)
     if not submission:
         return jsonify({'error': 'Submission not found'}), 404
-    submission.content = data.get('content', submission.content)
+    if 'content' in data:
+        submission.content = data['content']
+        submission.edited_at = datetime.utcnow()
     db.session.commit()
+    similarity_index.add(submission.essay_id, submission.id, submission.student_id, submission.content)
     return jsonify({'message': 'Submission updated'})
 
 # Chấm điểm tự động
@@ -242,8 +693,8 @@ def auto_grade(submission_id):
     if not submission:
         return jsonify({'error': 'Submission not found'}), 404
     essay = Essay.query.get(submission.essay_id)
-    score, reasons = grade_essay(submission.content, essay.criteria)
-    submission.suggested_score = score
+    score, reasons = grade_essay(submission.content, essay.criteria, essay.id, essay.criteria_hash)
+    set_submission_scores(db.session, submission, suggested_score=score, grading_pending=False)
     db.session.commit()
     return jsonify({'suggested_score': score, 'reasons': reasons})
 
@@ -254,26 +705,28 @@ def give_feedback(submission_id):
     submission = Submission.query.get(submission_id)
     if not submission:
         return jsonify({'error': 'Submission not found'}), 404
-    submission.final_score = data.get('final_score', submission.suggested_score)
-    submission.feedback = data.get('feedback', '')
+    # Giáo viên đã chấm -> job chấm tự động còn trong hàng đợi (hoặc được đưa lại sau restart) không ghi đè feedback
+    set_submission_scores(db.session, submission, final_score=data.get('final_score', submission.suggested_score),
+                          feedback=data.get('feedback', ''), grading_pending=False)
     db.session.commit()
     return jsonify({'message': 'Feedback and final score submitted'})
 
 # Xem chi tiết bài nộp
 @app.route('/submissions/<int:submission_id>', methods=['GET'])
 def get_submission(submission_id):
-    s = Submission.query.get(submission_id)
+    s = submission_rows(Submission.id == submission_id).first()
     if not s:
         return jsonify({'error': 'Submission not found'}), 404
     return jsonify({
         'id': s.id,
         'essay_id': s.essay_id,
         'student_id': s.student_id,
-        'student_name': s.student.username,
+        'student_name': s.student_name,
         'content': s.content,
         'suggested_score': s.suggested_score,
         'final_score': s.final_score,
-        'feedback': s.feedback
+        'feedback': s.feedback,
+        'submitted_at': s.submitted_at.isoformat() if s.submitted_at else None
     })
 
 # Sửa đề bài (exam_creator hoặc teacher)
@@ -286,30 +739,76 @@ def update_essay(essay_id):
         return jsonify({'error': 'Essay not found'}), 404
     essay.question = data.get('question', essay.question)
     if 'criteria' in data:
-        def normalize_criteria(criteria):
-            new_criteria = []
-            for c in criteria:
-                ctype = c.get('type')
-                deduct = float(c.get('deduct', 0.5))
-                if ctype == 'contains':
-                    phrase = c.get('phrase') or c.get('value')
-                    new_criteria.append({'type': 'contains', 'phrase': phrase, 'deduct': deduct})
-                elif ctype == 'min_words':
-                    count = c.get('count') or c.get('value')
-                    try:
-                        count = int(count)
-                    except:
-                        count = 0
-                    new_criteria.append({'type': 'min_words', 'count': count, 'deduct': deduct})
-                elif ctype == 'has_calculation':
-                    new_criteria.append({'type': 'has_calculation', 'deduct': deduct})
-                else:
-                    new_criteria.append(c)
-            return new_criteria
-        essay.criteria = json.dumps(normalize_criteria(data['criteria']))
+        try:
+            set_essay_criteria(essay, data['criteria'])
+        except CriteriaError as e:
+            return jsonify({'error': str(e)}), 400
     db.session.commit()
+    invalidate_criteria(essay.id)
+    response_cache.invalidate('essays', f'essay:{essay.id}', 'assignments')
     return jsonify({'message': 'Essay updated', 'id': essay.id})
 
+# Chấm lại hàng loạt toàn bộ bài nộp của 1 đề (sau khi sửa tiêu chí)
+@app.route('/essays/<int:essay_id>/regrade', methods=['POST'])
+@require_role('exam_creator', 'teacher')
+def regrade_submissions(essay_id):
+    data = request.json or {}
+    essay = Essay.query.get(essay_id)
+    if not essay:
+        return jsonify({'error': 'Essay not found'}), 404
+    try:
+        batch_size = int(data.get('batch_size', app.config['REGRADE_BATCH_SIZE']))
+        n_process = int(data.get('n_process', app.config['REGRADE_N_PROCESS']))
+        chunk_size = int(data.get('chunk_size', app.config['REGRADE_CHUNK_SIZE']))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid regrade options'}), 400
+    if batch_size < 1 or n_process < 1 or chunk_size < 1:
+        return jsonify({'error': 'Invalid regrade options'}), 400
+    # Chạy nền qua hàng đợi, tiến độ xem ở /grading/jobs/<job_id>
+    if app.config['GRADING_ASYNC']:
+        job_id = grading_queue.submit(regrade_essay, essay_id, batch_size, n_process, chunk_size,
+                                      kind='regrade', essay_id=essay_id)
+        return jsonify({'message': 'Regrade started', 'job_id': job_id, 'status': 'queued'}), 202
+    stats = regrade_essay(essay_id, batch_size, n_process, chunk_size)
+    return jsonify({'message': 'Regrade finished', **stats})
+
+# Thống kê điểm của 1 đề (số bài, trung bình, phương sai, histogram, pass rate, chênh lệch final - suggested)
+# Đọc từ bảng thống kê đã cộng dồn sẵn, không quét bài nộp
+@app.route('/essays/<int:essay_id>/stats', methods=['GET'])
+@require_role('exam_creator', 'teacher')
+def essay_stats(essay_id):
+    stats = read_essay_stats(db.session, essay_id, app.config['STATS_PASS_SCORE'])
+    if stats is None:
+        if not Essay.query.get(essay_id):
+            return jsonify({'error': 'Essay not found'}), 404
+        rebuild_essay_stats(db.session, essay_id)
+        db.session.commit()
+        stats = read_essay_stats(db.session, essay_id, app.config['STATS_PASS_SCORE'])
+    return jsonify(stats)
+
+# Các cặp bài nộp giống nhau trong 1 đề (nghi chép bài): ?threshold=0.5 (cosine 0-1), ?limit=100
+@app.route('/essays/<int:essay_id>/similar-pairs', methods=['GET'])
+@require_role('exam_creator', 'teacher')
+def similar_pairs(essay_id):
+    if not Essay.query.get(essay_id):
+        return jsonify({'error': 'Essay not found'}), 404
+    try:
+        threshold = float(request.args.get('threshold', app.config['SIMILARITY_THRESHOLD']))
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return jsonify({'error': 'Invalid threshold or limit'}), 400
+    if not 0 < threshold <= 1 or limit < 1:
+        return jsonify({'error': 'threshold must be in (0, 1] and limit >= 1'}), 400
+    start = time.perf_counter()
+    count, pairs = similarity_index.similar_pairs(essay_id, threshold, limit)
+    return jsonify({
+        'essay_id': essay_id,
+        'submission_count': count,
+        'threshold': threshold,
+        'pairs': pairs,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+    })
+
 # Xóa đề bài (exam_creator hoặc teacher)
 @app.route('/essays/<int:essay_id>', methods=['DELETE'])
 @require_role('exam_creator', 'teacher')
@@ -317,8 +816,12 @@ def delete_essay(essay_id):
     essay = Essay.query.get(essay_id)
     if not essay:
         return jsonify({'error': 'Essay not found'}), 404
+    delete_essay_stats(db.session, essay_id)
     db.session.delete(essay)
     db.session.commit()
+    invalidate_criteria(essay_id)
+    similarity_index.discard(essay_id)
+    response_cache.invalidate('essays', f'essay:{essay_id}', 'assignments')
     return jsonify({'message': 'Essay deleted', 'id': essay_id})
 
 # Teacher tạo assignment (giao đề cho học sinh/lớp)
@@ -334,37 +837,29 @@ def create_assignment():
             return jsonify({'error': 'Invalid deadline format'}), 400
     assignment = Assignment(
         essay_id=data['essay_id'],
-        teacher_id=data['user_id'],
+        teacher_id=g.user_id,
         deadline=deadline
     )
     db.session.add(assignment)
     db.session.commit()
+    response_cache.invalidate('assignments')
     return jsonify({'message': 'Assignment created', 'assignment_id': assignment.id})
 
 # Lấy danh sách assignment của teacher
 @app.route('/assignments', methods=['GET'])
 @require_role('teacher')
 def list_assignments():
-    teacher_id = request.args.get('user_id')
-    assignments = Assignment.query.filter_by(teacher_id=teacher_id).all()
-    return jsonify([
-        {
-            'id': a.id,
-            'essay_id': a.essay_id,
-            'question': a.essay.question,
-            'teacher_id': a.teacher_id,
-            'teacher_name': a.teacher.username
-        } for a in assignments
-    ])
+    teacher_id = g.user_id
+    return list_response(
+        lambda columns: assignment_rows(Assignment.teacher_id == teacher_id, columns=columns),
+        ASSIGNMENT_FIELDS, Assignment.id
+    )
 
 # Admin xem danh sách user
 @app.route('/users', methods=['GET'])
 @require_role('admin')
 def list_users():
-    users = User.query.all()
-    return jsonify([
-        {'id': u.id, 'username': u.username, 'role': u.role} for u in users
-    ])
+    return list_response(lambda columns: db.session.query(*columns), USER_FIELDS, User.id)
 
 # Admin xóa user
 @app.route('/users/<int:user_id>', methods=['DELETE'])
@@ -375,6 +870,8 @@ def delete_user(user_id):
         return jsonify({'error': 'User not found'}), 404
     db.session.delete(user)
     db.session.commit()
+    role_cache.invalidate(user_id)
+    response_cache.invalidate('assignments')
     return jsonify({'message': 'User deleted', 'id': user_id})
 
 # Admin tạo user mới
@@ -410,6 +907,8 @@ def update_user(user_id):
     if 'password' in data:
         user.password = generate_password_hash(data['password'])
     db.session.commit()
+    role_cache.invalidate(user.id)
+    response_cache.invalidate('assignments')
     return jsonify({'message': 'User updated', 'id': user.id})
 
 # Sửa assignment (teacher)
@@ -423,6 +922,7 @@ def update_assignment(assignment_id):
     if 'essay_id' in data:
         assignment.essay_id = data['essay_id']
     db.session.commit()
+    response_cache.invalidate('assignments')
     return jsonify({'message': 'Assignment updated', 'id': assignment.id})
 
 # Xóa assignment (teacher)
@@ -434,23 +934,24 @@ def delete_assignment(assignment_id):
         return jsonify({'error': 'Assignment not found'}), 404
     db.session.delete(assignment)
     db.session.commit()
+    response_cache.invalidate('assignments')
     return jsonify({'message': 'Assignment deleted', 'id': assignment_id})
 
 # Student xem assignment được giao
+# Câu hỏi của đề và tên giáo viên nằm trong output nên cũng phụ thuộc tag 'essays'/'assignments' khi sửa user
 @app.route('/assignments/for_student', methods=['GET'])
+@response_cache.cached('assignments', 'essays')
 def assignments_for_student():
     student_id = request.args.get('student_id')
     # Hiện tại: trả về tất cả assignment (có thể mở rộng theo class/group sau)
-    assignments = Assignment.query.all()
-    return jsonify([
-        {
-            'id': a.id,
-            'essay_id': a.essay_id,
-            'question': a.essay.question,
-            'teacher_id': a.teacher_id,
-            'teacher_name': a.teacher.username
-        } for a in assignments
-    ])
+    return list_response(lambda columns: assignment_rows(columns=columns), ASSIGNMENT_FIELDS, Assignment.id)
 
 if __name__ == '__main__':
+    # SIGTERM -> thoát bình thường để atexit ghi nốt bản nháp
+    import signal, sys
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # Chỉ process con của reloader mới phục vụ request -> chấm lại bài chờ chấm ở đó
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        with app.app_context():
+            recover_pending_grading()
     app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+TOKEN_SALT = 'essay-grading-session'
+# Khóa mặc định khi chưa đặt SECRET_KEY: ai cũng biết nên ai cũng ký được token -> chỉ dùng khi phát triển
+DEV_SECRET_KEY = 'dev-secret-change-me'
+
+
+# Cache user_id -> role trong process, hết hạn sau ttl giây (ttl = 0 -> tắt cache)
+# update_user/delete_user gọi invalidate() nhưng chỉ xóa được cache của process hiện tại; các process khác
+# tự hết hạn theo ttl -> role khác 'student' (có quyền cao hơn) dùng elevated_ttl ngắn hơn để bị hạ quyền/xóa
+# thì mất quyền sớm
+class RoleCache:
+    def __init__(self, ttl=60, elevated_ttl=5, maxsize=10000):
+        self.ttl = ttl
+        self.elevated_ttl = elevated_ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            if entry:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def set(self, user_id, role):
+        ttl = self.ttl if role == 'student' else min(self.ttl, self.elevated_ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (role, time.monotonic() + ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _serializer(app):
+    return URLSafeTimedSerializer(app.config['SECRET_KEY'], salt=TOKEN_SALT)
+
+
+# Token phiên ký bằng SECRET_KEY, chỉ chứa user id (role luôn lấy qua RoleCache/DB)
+def issue_token(app, user_id):
+    return _serializer(app).dumps({'uid': user_id})
+
+
+# Trả về user id nếu token hợp lệ và chưa hết hạn, ngược lại None
+def verify_token(app, token):
+    try:
+        data = _serializer(app).loads(token, max_age=app.config['AUTH_TOKEN_MAX_AGE'])
+    except (BadSignature, SignatureExpired):
+        return None
+    return data.get('uid') if isinstance(data, dict) else None
+
+
+role_cache = RoleCache()
@@ -0,0 +1,54 @@
+# Đo chi phí xác thực trên endpoint được bảo vệ (GET /assignments):
+#   - user_id + query DB mỗi request (cache role tắt)
+#   - token phiên + cache role
+# và chi phí 1 lần login (check_password_hash) nếu client đăng nhập lại mỗi lần
+# Chạy: python benchmarks/bench_auth.py --requests 2000
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def timed(n, fn):
+    queries = 0
+    start = time.perf_counter()
+    for _ in range(n):
+        res = fn()
+        queries += int(res.headers.get('X-Query-Count', 0))
+    return (time.perf_counter() - start) / n * 1000, queries / n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--logins', type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench.db")}'
+    import app as app_module
+    from auth import role_cache
+    client = app_module.app.test_client()
+    client.post('/register', json={'username': 'teacher', 'password': 'secret', 'role': 'teacher'})
+    login = client.post('/login', json={'username': 'teacher', 'password': 'secret'}).get_json()
+    user_id, token = login['id'], login['token']
+    # Endpoint rẻ nhất có @require_role: danh sách assignment rỗng
+    url = '/assignments'
+
+    role_cache.ttl = 0
+    role_cache.clear()
+    legacy_ms, legacy_q = timed(args.requests, lambda: client.get(f'{url}?user_id={user_id}'))
+    role_cache.ttl = 60
+    token_ms, token_q = timed(args.requests, lambda: client.get(url, headers={'Authorization': f'Bearer {token}'}))
+    login_ms, _ = timed(args.logins, lambda: client.post('/login', json={'username': 'teacher', 'password': 'secret'}))
+
+    print(f'user_id, no role cache : {legacy_ms:7.3f} ms/request, {legacy_q:.1f} queries/request')
+    print(f'token + role cache     : {token_ms:7.3f} ms/request, {token_q:.1f} queries/request '
+          f'(saved {legacy_ms - token_ms:.3f} ms, cache hits {role_cache.hits})')
+    print(f'login (password hash)  : {login_ms:7.3f} ms/request')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# Stress test: N client song song nộp bài + lưu nháp qua HTTP vào server Flask (threaded)
+# So sánh journal mode SQLite, đếm request lỗi và lỗi "database is locked"
+# Chạy: python benchmarks/bench_concurrency.py --clients 32 --requests 50 --modes DELETE WAL
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+class LockErrorCounter(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def emit(self, record):
+        text = record.getMessage() + (str(record.exc_info[1]) if record.exc_info else '')
+        if 'database is locked' in text:
+            self.count += 1
+
+
+def post(base, path, payload):
+    req = urllib.request.Request(base + path, data=json.dumps(payload).encode('utf-8'),
+                                 headers={'Content-Type': 'application/json'}, method='POST')
+    try:
+        with urllib.request.urlopen(req, timeout=60) as res:
+            return res.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def child(args):
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench.db")}'
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    os.environ['SQLITE_JOURNAL_MODE'] = args.mode
+    os.environ['DRAFT_FLUSH_INTERVAL'] = '0'
+    from werkzeug.serving import make_server
+    import app as app_module
+
+    counter = LockErrorCounter()
+    app_module.app.logger.addHandler(counter)
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+
+    post(base, '/register', {'username': 'teacher', 'password': 'x', 'role': 'teacher'})
+    essay_id = 1
+    post(base, '/essays', {'user_id': 1, 'question': 'Q', 'criteria': [{'type': 'min_words', 'count': 50}]})
+    text = 'Students write about energy and climate with 2 + 2 examples. ' * 30
+
+    def client(n):
+        statuses = []
+        for i in range(args.requests):
+            statuses.append(post(base, f'/essays/{essay_id}/drafts', {'student_id': 1000 + n, 'content': text[:i * 10]}))
+            statuses.append(post(base, f'/essays/{essay_id}/submissions', {'student_id': 1000 + n, 'content': text}))
+        return statuses
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.clients) as pool:
+        statuses = [s for r in pool.map(client, range(args.clients)) for s in r]
+    elapsed = time.perf_counter() - start
+    app_module.grading_queue.join(timeout=120)
+    server.shutdown()
+    errors = sum(1 for s in statuses if s >= 500)
+    print(json.dumps({'requests': len(statuses), 'elapsed': elapsed, 'errors': errors, 'locked': counter.count}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=50, help='số vòng (lưu nháp + nộp bài) mỗi client')
+    parser.add_argument('--modes', nargs='+', default=['DELETE', 'WAL'])
+    parser.add_argument('--mode', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        child(args)
+        return
+    for mode in args.modes:
+        out = subprocess.run([sys.executable, __file__, '--mode', mode, '--clients', str(args.clients),
+                              '--requests', str(args.requests)],
+                             capture_output=True, text=True, check=True).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f'journal_mode={mode:7s}: {r["requests"] / r["elapsed"]:8.1f} req/s, '
+              f'{r["errors"]} failed requests, {r["locked"]} "database is locked" errors')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# Microbenchmark: đánh giá tiêu chí kiểu cũ (json.loads + lower mỗi rule) so với bộ tiêu chí đã biên dịch
+# Không gọi spaCy: số từ được tính trước để chỉ đo phần đánh giá rule
+# Chạy: python benchmarks/bench_criteria.py --rules 50 200 1000
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from criteria_engine import CompiledCriteria, CriteriaCache, PhraseMatcher, paragraph_count
+
+
+# Bản sao logic grade_essay trước khi có bộ tiêu chí biên dịch (để so sánh kết quả và tốc độ)
+def legacy_evaluate(content, criteria_json, word_count):
+    reasons = []
+    score = 10.0
+    try:
+        criteria = json.loads(criteria_json)
+    except:
+        return 0, ["Lỗi tiêu chí"]
+    for c in criteria:
+        deduct = float(c.get('deduct', 0.5))
+        if c.get('type') == 'contains':
+            phrase = c.get('phrase', '').lower()
+            if phrase and phrase not in content.lower():
+                score -= deduct
+                reasons.append(f"Thiếu cụm từ '{phrase}' (-{deduct} điểm)")
+        elif c.get('type') == 'min_words':
+            min_words = int(c.get('count', 0))
+            if word_count < min_words:
+                score -= deduct
+                reasons.append(f"Độ dài < {min_words} từ (-{deduct} điểm)")
+        elif c.get('type') == 'has_calculation':
+            if not re.search(r'\d+\s*[+\-*/]\s*\d+', content):
+                score -= deduct
+                reasons.append(f"Không có phép tính (-{deduct} điểm)")
+    score = max(0, min(10, score))
+    return score, reasons
+
+
+def make_case(rng, n_rules, n_words=800):
+    vocab = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 9)))
+             for _ in range(2000)]
+    words = [rng.choice(vocab) for _ in range(n_words)]
+    content = ' '.join(w.capitalize() if rng.random() < 0.1 else w for w in words) + ' 12 + 7.'
+    criteria = [{'type': 'min_words', 'count': 500, 'deduct': 1}, {'type': 'has_calculation', 'deduct': 1}]
+    for _ in range(n_rules):
+        if rng.random() < 0.5:
+            i = rng.randrange(len(words) - 2)
+            phrase = ' '.join(words[i:i + rng.randint(1, 3)])
+        else:
+            phrase = ' '.join(rng.choice(vocab) for _ in range(2))
+        criteria.append({'type': 'contains', 'phrase': phrase, 'deduct': 0.1})
+    return content, json.dumps(criteria), n_words
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rules', type=int, nargs='+', default=[50, 200, 1000])
+    parser.add_argument('--number', type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    # Đoạn văn ngắt dòng cứng vẫn là 1 đoạn, chỉ dòng trống mới tách đoạn
+    wrapped = 'First line of a paragraph\nwrapped onto a second line\nand a third.'
+    assert paragraph_count(wrapped) == 1
+    assert paragraph_count(wrapped + '\n\n  \nSecond paragraph.\n') == 2
+    assert paragraph_count('') == 0
+    rule = CompiledCriteria([{'type': 'min_paragraphs', 'count': 2, 'deduct': 1}])
+    assert rule.evaluate(wrapped)[0] == 9.0
+
+    for n_rules in args.rules:
+        content, criteria_json, word_count = make_case(rng, n_rules)
+        cache = CriteriaCache()
+        compiled = cache.get(criteria_json, essay_id=1)
+        assert compiled.evaluate(content, word_count=word_count) == legacy_evaluate(content, criteria_json, word_count)
+
+        # So sánh riêng 2 chiến lược tìm cụm từ để chọn ngưỡng MATCHER_MIN_PHRASES
+        criteria = json.loads(criteria_json)
+        scan = CompiledCriteria(criteria)
+        scan.matcher = None
+        automaton = CompiledCriteria(criteria)
+        automaton.matcher = PhraseMatcher(automaton.phrases)
+        assert scan.found_phrases(content) == automaton.found_phrases(content)
+
+        def per_call(fn):
+            return timeit.timeit(fn, number=args.number) / args.number * 1e6
+
+        legacy = per_call(lambda: legacy_evaluate(content, criteria_json, word_count))
+        cached = per_call(lambda: cache.get(criteria_json, essay_id=1).evaluate(content, word_count=word_count))
+        t_scan = per_call(lambda: scan.evaluate(content, word_count=word_count))
+        t_auto = per_call(lambda: automaton.evaluate(content, word_count=word_count))
+        print(f'{n_rules:5d} rules: legacy {legacy:9.1f} us | compiled+cache {cached:9.1f} us '
+              f'(scan {t_scan:9.1f} us, aho-corasick {t_auto:9.1f} us)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+# Mô phỏng cao điểm sát deadline: N học sinh lưu nháp vài lần rồi cùng nộp bài trong vài giây cuối trước deadline
+# So sánh không kiểm soát tải (chấm ngay trong mọi request) với admission control (giới hạn tốc độ + giới hạn
+# số bài chấm đồng thời, bài vượt chỗ được chấm sau); client gặp 429 thì chờ Retry-After rồi gửi lại
+# Đếm bài nộp được nhận trước deadline, bài lỡ deadline, lỗi/timeout, độ trễ và thời gian tới khi chấm xong hết
+# Chạy: python benchmarks/bench_deadline.py --students 500
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.corpus import generate_essay
+from benchmarks.bench_serving import free_port
+
+SERVER = '''
+import sys
+from werkzeug.serving import make_server
+import app as app_module
+server = make_server('127.0.0.1', int(sys.argv[1]), app_module.app, threaded=True)
+server.socket.listen(1024)
+server.serve_forever()
+'''
+
+MODES = {
+    'unlimited': {'RATE_LIMIT_ENABLED': '0', 'GRADING_MAX_INFLIGHT': '0'},
+    'admission': {'RATE_LIMIT_ENABLED': '1'},
+}
+
+
+def call(base, path, payload=None, timeout=30):
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(base + path, data=data, headers={'Content-Type': 'application/json'},
+                                 method='POST' if data else 'GET')
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as res:
+            return res.status, json.loads(res.read() or b'null'), None
+    except urllib.error.HTTPError as e:
+        return e.code, None, e.headers.get('Retry-After')
+    except OSError:
+        return 0, None, None
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0
+
+
+def run(mode, args):
+    env = dict(os.environ, **MODES[mode],
+               DATABASE_URL=f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench.db")}',
+               GRADING_ASYNC='0', GRADING_CACHE_SIZE='0', RESPONSE_CACHE_ENABLED='0')
+    port = free_port()
+    base = f'http://127.0.0.1:{port}'
+    server = subprocess.Popen([sys.executable, '-c', SERVER, str(port)], cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while call(base, '/essays')[0] != 200:
+            if server.poll() is not None:
+                raise RuntimeError('server did not start')
+            time.sleep(0.2)
+        call(base, '/register', {'username': 'teacher', 'password': 'x', 'role': 'teacher'})
+        call(base, '/essays', {'user_id': 1, 'question': 'Q', 'criteria': [
+            {'type': 'min_words', 'count': 300}, {'type': 'max_sentences', 'count': 60},
+            {'type': 'keyword_frequency', 'keyword': 'energy', 'min_count': 2},
+        ]})
+        # Server so deadline với datetime.utcnow()
+        deadline = datetime.utcnow() + timedelta(seconds=args.lead + args.window + args.margin)
+        call(base, '/assignments', {'user_id': 1, 'essay_id': 1, 'deadline': deadline.isoformat()})
+        burst_start = time.monotonic() + args.lead
+        rng = random.Random(8)
+        texts = [generate_essay(rng, args.words) for _ in range(100)]
+        plans = [(rng.uniform(0, args.lead), rng.uniform(0, args.window)) for _ in range(args.students)]
+
+        samples = []
+        stop = threading.Event()
+
+        def monitor():
+            while not stop.wait(0.2):
+                status, body, _ = call(base, '/admission', timeout=5)
+                if status == 200:
+                    samples.append(body['grading_queue_depth'] + body['grading_queue_running'])
+
+        def student(n):
+            draft_at, submit_at = plans[n]
+            text = texts[n % len(texts)]
+            time.sleep(max(0.0, burst_start - args.lead + draft_at - time.monotonic()))
+            drafts = 0
+            for i in range(1, 4):
+                status, _, _ = call(base, '/essays/1/drafts', {'student_id': 1000 + n, 'content': text[:i * len(text) // 4]})
+                drafts += status == 200
+            time.sleep(max(0.0, burst_start + submit_at - time.monotonic()))
+            start = time.perf_counter()
+            retries = 0
+            while True:
+                status, body, retry_after = call(base, '/essays/1/submissions', {'student_id': 1000 + n, 'content': text})
+                if status != 429:
+                    break
+                retries += 1
+                time.sleep(min(float(retry_after or 1), 5))
+            return status, time.perf_counter() - start, retries, drafts
+
+        watcher = threading.Thread(target=monitor, daemon=True)
+        watcher.start()
+        with ThreadPoolExecutor(args.students) as pool:
+            results = list(pool.map(student, range(args.students)))
+        accepted = sum(1 for r in results if r[0] in (200, 202))
+
+        # Chờ chấm xong các bài được chấm sau
+        start = time.monotonic()
+        graded = late = 0
+        while time.monotonic() - start < args.grading_timeout:
+            status, rows, _ = call(base, '/essays/1/submissions?fields=suggested_score,submitted_at')
+            if status == 200:
+                graded = sum(1 for row in rows if row['suggested_score'] is not None)
+                late = sum(1 for row in rows if datetime.fromisoformat(row['submitted_at']) > deadline)
+                if graded >= len(rows):
+                    break
+            time.sleep(0.5)
+        drain = time.monotonic() - start
+        stop.set()
+        latencies = [r[1] for r in results if r[0] in (200, 202)]
+        return {
+            'mode': mode,
+            'accepted': accepted,
+            'graded_inline': sum(1 for r in results if r[0] == 200),
+            'deferred': sum(1 for r in results if r[0] == 202),
+            'missed_deadline': sum(1 for r in results if r[0] == 400),
+            'failed': sum(1 for r in results if r[0] not in (200, 202, 400)),
+            'retries_429': sum(r[2] for r in results),
+            'drafts_saved': sum(r[3] for r in results),
+            'p50_ms': round(percentile(latencies, 0.5) * 1000),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000),
+            'max_queue_depth': max(samples, default=0),
+            'graded': graded,
+            'late_receipts': late,
+            'drain_s': round(drain, 1),
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--words', type=int, default=600)
+    parser.add_argument('--lead', type=float, default=5, help='số giây lưu nháp trước đợt nộp')
+    parser.add_argument('--window', type=float, default=1, help='đợt nộp dồn trong bao nhiêu giây')
+    parser.add_argument('--margin', type=float, default=1, help='đợt nộp kết thúc bao nhiêu giây trước deadline')
+    parser.add_argument('--grading-timeout', type=float, default=300)
+    args = parser.parse_args()
+
+    ok = True
+    for mode in args.modes:
+        r = run(mode, args)
+        print(json.dumps(r))
+        if mode == 'admission':
+            ok = r['failed'] == 0 and r['missed_deadline'] == 0 and r['late_receipts'] == 0 and r['graded'] == r['accepted']
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
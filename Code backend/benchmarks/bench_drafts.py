@@ -0,0 +1,99 @@
+# Load test lưu nháp: N học sinh autosave liên tục
+#   full     : gửi toàn bộ content, ghi DB mỗi lần (DRAFT_FLUSH_INTERVAL=0, như cũ)
+#   buffered : gửi patch theo version, gộp trong bộ nhớ và flush theo chu kỳ
+# Đo độ trễ mỗi lần lưu, số dòng/bytes ghi xuống DB (write amplification = bytes ghi DB / bytes gõ thêm)
+# Chạy: python benchmarks/bench_drafts.py --students 40 --ticks 50 --threads 8
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SENTENCE = 'Renewable energy adoption reduces emissions over time. '
+
+
+def student_session(client, essay_id, student_id, ticks, use_patches):
+    latencies = []
+    content = ''
+    version = 0
+    for _ in range(ticks):
+        start = time.perf_counter()
+        if use_patches:
+            patch = {'start': len(content), 'end': len(content), 'text': SENTENCE}
+            res = client.post(f'/essays/{essay_id}/drafts', json={
+                'student_id': student_id, 'base_version': version, 'patches': [patch]
+            })
+        else:
+            res = client.post(f'/essays/{essay_id}/drafts', json={
+                'student_id': student_id, 'content': content + SENTENCE
+            })
+        latencies.append((time.perf_counter() - start) * 1000)
+        content += SENTENCE
+        version = res.get_json()['version']
+    return latencies
+
+
+def run(app_module, essay_id, students, ticks, threads, use_patches, flush_interval, first_student):
+    buffer = app_module.draft_buffer
+    buffer.flush_interval = flush_interval
+    before = buffer.stats()
+    client = app_module.app.test_client()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(
+            lambda sid: student_session(client, essay_id, sid, ticks, use_patches),
+            range(first_student, first_student + students)
+        ))
+    elapsed = time.perf_counter() - start
+    with app_module.app.app_context():
+        buffer.flush()
+    after = buffer.stats()
+    latencies = sorted(l for r in results for l in r)
+    typed = students * ticks * len(SENTENCE)
+    rows = after['rows_written'] - before['rows_written']
+    written = after['bytes_written'] - before['bytes_written']
+    return {
+        'saves_per_s': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies),
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1],
+        'db_rows': rows,
+        'db_bytes': written,
+        'amplification': written / typed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--students', type=int, default=40)
+    parser.add_argument('--ticks', type=int, default=50)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--flush-interval', type=float, default=5.0)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench.db")}'
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    import app as app_module
+    client = app_module.app.test_client()
+    client.post('/register', json={'username': 'bench_teacher', 'password': 'x', 'role': 'teacher'})
+    teacher = client.post('/login', json={'username': 'bench_teacher', 'password': 'x'}).get_json()
+    essay_id = client.post('/essays', json={
+        'user_id': teacher['id'], 'question': 'Bench', 'criteria': []
+    }).get_json()['essay_id']
+
+    modes = (
+        ('full content, write-through', False, 0, 1000),
+        ('patches, buffered', True, args.flush_interval, 2000),
+    )
+    for label, use_patches, interval, first_student in modes:
+        r = run(app_module, essay_id, args.students, args.ticks, args.threads, use_patches, interval, first_student)
+        print(f'{label:28s}: {r["saves_per_s"]:8.1f} saves/s, p50 {r["p50_ms"]:6.2f} ms, p99 {r["p99_ms"]:7.2f} ms, '
+              f'{r["db_rows"]:6d} DB row writes, {r["db_bytes"] / 1024:9.1f} KiB written, '
+              f'write amplification {r["amplification"]:6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# GET /essays với nhiều đề: criteria lưu sẵn JSON đã chuẩn hóa được ghép thẳng vào output
+# so với cách cũ (json.loads từng dòng rồi jsonify lại)
+# Chạy: python benchmarks/bench_essays_list.py --essays 5000
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import generate_criteria
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--essays', type=int, default=5000)
+    parser.add_argument('--rules', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench.db")}'
+    import app as app_module
+    from flask import jsonify
+    from models import db, Essay, User
+    from criteria_schema import set_essay_criteria
+
+    app = app_module.app
+    rng = random.Random(5)
+    with app.app_context():
+        teacher = User(username='teacher', password='x', role='teacher')
+        db.session.add(teacher)
+        db.session.flush()
+        for i in range(args.essays):
+            essay = Essay(question=f'Q{i}', teacher_id=teacher.id)
+            set_essay_criteria(essay, generate_criteria(rng, args.rules))
+            db.session.add(essay)
+        db.session.commit()
+
+    client = app.test_client()
+
+    # Cách cũ: parse criteria của từng dòng rồi serialize lại
+    def legacy():
+        with app.test_request_context('/essays'):
+            rows = db.session.query(Essay.id, Essay.question, Essay.criteria, Essay.teacher_id).order_by(Essay.id)
+            return jsonify([{'id': r.id, 'question': r.question, 'criteria': json.loads(r.criteria),
+                             'teacher_id': r.teacher_id} for r in rows]).get_data()
+
+    raw_time, res = timed(lambda: client.get('/essays'), args.repeat)
+    legacy_time, legacy_body = timed(legacy, args.repeat)
+    body = res.get_json()
+    same = [e['criteria'] for e in body] == [e['criteria'] for e in json.loads(legacy_body)]
+
+    print(f'{args.essays} essays x {args.rules} rules')
+    print(f'GET /essays (raw criteria JSON): {raw_time * 1000:8.1f} ms')
+    print(f'legacy json.loads per row      : {legacy_time * 1000:8.1f} ms ({legacy_time / raw_time:.1f}x)')
+    print(f'same criteria in output        : {same}')
+    sys.exit(0 if same else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# Import bài nộp: từng bài qua POST /essays/<id>/submissions so với 1 file qua /submissions/import
+# và xuất CSV/Parquet qua /submissions/export (đo bộ nhớ đỉnh bằng tracemalloc)
+# Chạy: python benchmarks/bench_import.py --rows 2000 --export-rows 100000
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import generate_essay, generate_criteria
+
+
+def make_file(rng, n_rows, fmt, student_ids):
+    essays = [generate_essay(rng, 300) for _ in range(min(n_rows, 200))]
+    out = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(['student_id', 'content'])
+        for i in range(n_rows):
+            writer.writerow([student_ids[i % len(student_ids)], essays[i % len(essays)]])
+    else:
+        for i in range(n_rows):
+            out.write(json.dumps({'student_id': student_ids[i % len(student_ids)],
+                                  'content': essays[i % len(essays)]}) + '\n')
+    return out.getvalue().encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--single', type=int, default=200, help='số bài nộp từng cái để so sánh')
+    parser.add_argument('--export-rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench.db")}'
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    os.environ['GRADING_ASYNC'] = '0'
+    import app as app_module
+    from models import db, Submission
+    from score_stats import rebuild_essay_stats
+    from result_cache import result_cache
+
+    # Đo chi phí chấm thật, không lấy lại kết quả đã chấm
+    result_cache.configure(maxsize=0, store=None)
+    rng = random.Random(3)
+    client = app_module.app.test_client()
+    client.post('/register', json={'username': 'teacher', 'password': 'x', 'role': 'teacher'})
+    token = client.post('/login', json={'username': 'teacher', 'password': 'x'}).get_json()['token']
+    auth = {'Authorization': f'Bearer {token}'}
+    criteria = generate_criteria(rng, 10)
+    essay_ids = [client.post('/essays', headers=auth, json={'question': f'Q{i}', 'criteria': criteria})
+                 .get_json()['essay_id'] for i in range(3)]
+    student_ids = []
+    for i in range(50):
+        res = client.post('/register', json={'username': f'student{i}', 'password': 'x', 'role': 'student'})
+        student_ids.append(res.get_json().get('id', i + 2))
+
+    single_file = make_file(rng, args.single, 'jsonl', student_ids)
+    start = time.perf_counter()
+    for line in single_file.decode('utf-8').splitlines():
+        client.post(f'/essays/{essay_ids[0]}/submissions', json=json.loads(line))
+    single_rate = args.single / (time.perf_counter() - start)
+    print(f'per-item POST          : {single_rate:8.1f} rows/s ({args.single} rows)')
+
+    for fmt, essay_id in (('csv', essay_ids[1]), ('jsonl', essay_ids[2])):
+        data = make_file(rng, args.rows, fmt, student_ids)
+        start = time.perf_counter()
+        res = client.post(f'/essays/{essay_id}/submissions/import?format={fmt}', headers=auth, data=data,
+                          content_type='text/csv' if fmt == 'csv' else 'application/x-ndjson')
+        elapsed = time.perf_counter() - start
+        body = res.get_json()
+        print(f'bulk import ({fmt:5s})   : {args.rows / elapsed:8.1f} rows/s ({body["imported"]} imported, '
+              f'{body["skipped"]} skipped, {args.rows / elapsed / single_rate:.1f}x)')
+
+    # Export: thêm nhiều dòng vào 1 đề rồi đo bộ nhớ đỉnh khi stream
+    with app_module.app.app_context():
+        for offset in range(0, args.export_rows, 10000):
+            db.session.execute(db.insert(Submission), [{
+                'essay_id': essay_ids[0], 'student_id': student_ids[0], 'content': 'x',
+                'suggested_score': rng.uniform(0, 10), 'feedback': 'Good job!',
+            } for _ in range(min(10000, args.export_rows - offset))])
+        rebuild_essay_stats(db.session, essay_ids[0])
+        db.session.commit()
+    for fmt in ('csv', 'parquet'):
+        tracemalloc.start()
+        start = time.perf_counter()
+        res = client.get(f'/essays/{essay_ids[0]}/submissions/export?format={fmt}', headers=auth, buffered=False)
+        size = sum(len(chunk) for chunk in res.response)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        if res.status_code != 200:
+            print(f'export {fmt:7s}         : skipped ({res.status_code})')
+            continue
+        print(f'export {fmt:7s}         : {elapsed:6.2f}s, {size / 1e6:6.1f} MB output, '
+              f'peak Python memory {peak / 1e6:6.1f} MB ({args.export_rows + args.single} rows)')
+
+
+if __name__ == '__main__':
+    main()
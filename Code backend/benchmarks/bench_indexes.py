@@ -0,0 +1,100 @@
+# Benchmark truy vấn trên DB SQLite lớn: trước và sau khi migrate thêm index
+# Chạy: python benchmarks/bench_indexes.py --submissions 1000000
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, inspect, text
+from models import db
+from migrations import upgrade_schema
+
+QUERIES = {
+    'submission by (essay_id, student_id)':
+        'SELECT id, suggested_score FROM submission WHERE essay_id = :essay_id AND student_id = :student_id LIMIT 1',
+    'submissions of essay':
+        'SELECT id, student_id, suggested_score FROM submission WHERE essay_id = :essay_id',
+    'submissions of student':
+        'SELECT id, essay_id FROM submission WHERE student_id = :student_id',
+    'assignment by essay_id':
+        'SELECT id, deadline FROM assignment WHERE essay_id = :essay_id LIMIT 1',
+    'assignments of teacher':
+        'SELECT id, essay_id FROM assignment WHERE teacher_id = :teacher_id',
+    'draft by (essay_id, student_id)':
+        'SELECT id FROM essay_draft WHERE essay_id = :essay_id AND student_id = :student_id LIMIT 1',
+}
+
+
+def seed(engine, n_submissions, n_students, n_essays, n_teachers):
+    rng = random.Random(7)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        # Bỏ index để mô phỏng DB cũ chưa migrate
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(text(f'DROP INDEX IF EXISTS {index.name}'))
+        raw = conn.connection.driver_connection
+        raw.executemany('INSERT INTO user (id, username, password, role) VALUES (?, ?, ?, ?)',
+                        ((i, f'user{i}', 'x', 'teacher' if i <= n_teachers else 'student')
+                         for i in range(1, n_students + n_teachers + 1)))
+        raw.executemany('INSERT INTO essay (id, question, criteria, teacher_id) VALUES (?, ?, ?, ?)',
+                        ((i, f'Question {i}', '[]', rng.randint(1, n_teachers)) for i in range(1, n_essays + 1)))
+        raw.executemany('INSERT INTO assignment (essay_id, teacher_id) VALUES (?, ?)',
+                        ((i, rng.randint(1, n_teachers)) for i in range(1, n_essays + 1)))
+        raw.executemany('INSERT INTO submission (essay_id, student_id, content, suggested_score) VALUES (?, ?, ?, ?)',
+                        ((rng.randint(1, n_essays), rng.randint(n_teachers + 1, n_teachers + n_students),
+                          'lorem ipsum', 5.0) for _ in range(n_submissions)))
+        raw.executemany('INSERT INTO essay_draft (essay_id, student_id, content, last_saved) VALUES (?, ?, ?, ?)',
+                        ((e, s, 'draft', '2024-01-01 00:00:00')
+                         for e in range(1, n_essays + 1, 50)
+                         for s in range(n_teachers + 1, n_teachers + n_students + 1, 50)))
+
+
+def time_queries(engine, n_students, n_essays, n_teachers, repeat):
+    rng = random.Random(11)
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            params = [{
+                'essay_id': rng.randint(1, n_essays),
+                'student_id': rng.randint(n_teachers + 1, n_teachers + n_students),
+                'teacher_id': rng.randint(1, n_teachers),
+            } for _ in range(repeat)]
+            start = time.perf_counter()
+            for p in params:
+                conn.execute(text(sql), p).fetchall()
+            results[name] = (time.perf_counter() - start) / repeat * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--submissions', type=int, default=1000000)
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--essays', type=int, default=2000)
+    parser.add_argument('--teachers', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench.db")}')
+    start = time.perf_counter()
+    seed(engine, args.submissions, args.students, args.essays, args.teachers)
+    print(f'seeded {args.submissions} submissions in {time.perf_counter() - start:.1f}s')
+
+    before = time_queries(engine, args.students, args.essays, args.teachers, args.repeat)
+    start = time.perf_counter()
+    upgrade_schema(engine)
+    print(f'upgrade_schema: {time.perf_counter() - start:.1f}s, indexes: '
+          f'{sorted(ix["name"] for t in ("submission", "assignment", "essay_draft") for ix in inspect(engine).get_indexes(t))}')
+    after = time_queries(engine, args.students, args.essays, args.teachers, args.repeat)
+
+    for name in QUERIES:
+        print(f'{name:38s}: {before[name]:9.3f} ms -> {after[name]:7.3f} ms ({before[name] / after[name]:7.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# Kiểm tra số câu SQL của các endpoint danh sách không tăng theo số dòng (không có N+1 query)
+# Đọc header X-Query-Count; thoát với mã lỗi nếu số query thay đổi giữa 10 và 500 dòng
+# Chạy: python benchmarks/bench_queries.py --rows 500
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed(app_module, n):
+    from models import db, User, Essay, Submission, Assignment
+    with app_module.app.app_context():
+        db.session.execute(db.delete(Submission))
+        db.session.execute(db.delete(Assignment))
+        db.session.execute(db.delete(Essay))
+        db.session.execute(db.delete(User))
+        teacher = User(username='teacher', password='x', role='teacher')
+        db.session.add(teacher)
+        db.session.flush()
+        essay = Essay(question='Q', criteria='[]', teacher_id=teacher.id)
+        db.session.add(essay)
+        db.session.flush()
+        db.session.execute(db.insert(User), [
+            {'username': f'student{i}', 'password': 'x', 'role': 'student'} for i in range(n)
+        ])
+        student_ids = [row.id for row in db.session.query(User.id).filter_by(role='student')]
+        db.session.execute(db.insert(Submission), [
+            {'essay_id': essay.id, 'student_id': sid, 'content': 'text', 'suggested_score': 5.0}
+            for sid in student_ids
+        ])
+        db.session.execute(db.insert(Assignment), [
+            {'essay_id': essay.id, 'teacher_id': teacher.id} for _ in range(n)
+        ])
+        db.session.commit()
+        return teacher.id, essay.id, student_ids[0]
+
+
+def measure(client, teacher_id, essay_id, student_id):
+    urls = {
+        'list_submissions': f'/essays/{essay_id}/submissions',
+        'list_submissions (student)': f'/essays/{essay_id}/submissions?student_id={student_id}',
+        'list_assignments': f'/assignments?user_id={teacher_id}',
+        'assignments_for_student': f'/assignments/for_student?student_id={student_id}',
+    }
+    result = {}
+    for name, url in urls.items():
+        start = time.perf_counter()
+        res = client.get(url)
+        elapsed = (time.perf_counter() - start) * 1000
+        result[name] = (int(res.headers['X-Query-Count']), elapsed)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=500)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench.db")}'
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    # seed() ghi thẳng vào DB (không qua API) nên cache response không bị invalidate -> tắt để đếm query thật
+    os.environ['RESPONSE_CACHE_ENABLED'] = '0'
+    import app as app_module
+    from auth import role_cache
+    # Tắt cache role để lần đo đầu và lần đo sau có cùng số query kiểm tra quyền
+    role_cache.ttl = 0
+    client = app_module.app.test_client()
+
+    small = measure(client, *seed(app_module, 10))
+    large = measure(client, *seed(app_module, args.rows))
+    failed = False
+    for name in small:
+        ok = small[name][0] == large[name][0]
+        failed = failed or not ok
+        print(f'{name:28s}: 10 rows -> {small[name][0]} queries, {args.rows} rows -> {large[name][0]} queries '
+              f'({large[name][1]:.1f} ms) {"OK" if ok else "N+1!"}')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# Benchmark: chấm lại cả đề bằng POST /essays/<id>/regrade so với gọi /submissions/<id>/grade từng bài
+# Chạy: python benchmarks/bench_regrade.py --submissions 2000 --batch-size 64 --n-process 2
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ESSAY_TEXT = (
+    "Climate change is driven by greenhouse gases. If emissions grow by 2 + 3 percent "
+    "each year, the effect compounds quickly. "
+) * 40
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--submissions', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--n-process', type=int, default=1)
+    parser.add_argument('--skip-single', action='store_true', help='bỏ qua phần chấm từng bài')
+    args = parser.parse_args()
+
+    db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    os.environ['GRADING_ASYNC'] = '0'
+    import app as app_module
+    from models import db, Submission
+
+    client = app_module.app.test_client()
+    client.post('/register', json={'username': 'bench_teacher', 'password': 'x', 'role': 'teacher'})
+    teacher = client.post('/login', json={'username': 'bench_teacher', 'password': 'x'}).get_json()
+    criteria = [
+        {'type': 'contains', 'phrase': 'climate change', 'deduct': 2},
+        {'type': 'min_words', 'count': 150, 'deduct': 1.5},
+        {'type': 'has_calculation', 'deduct': 1},
+    ]
+    essay_id = client.post('/essays', json={
+        'user_id': teacher['id'], 'question': 'Bench', 'criteria': criteria
+    }).get_json()['essay_id']
+
+    with app_module.app.app_context():
+        db.session.execute(db.insert(Submission), [
+            {'essay_id': essay_id, 'student_id': teacher['id'], 'content': ESSAY_TEXT}
+            for _ in range(args.submissions)
+        ])
+        db.session.commit()
+        ids = [row.id for row in db.session.query(Submission.id)]
+
+    n = args.submissions
+    if not args.skip_single:
+        start = time.perf_counter()
+        for sid in ids:
+            client.post(f'/submissions/{sid}/grade')
+        elapsed = time.perf_counter() - start
+        print(f'per-submission /grade : {elapsed:7.2f}s ({n / elapsed:8.1f} submissions/s)')
+
+    start = time.perf_counter()
+    res = client.post(f'/essays/{essay_id}/regrade', json={
+        'user_id': teacher['id'], 'batch_size': args.batch_size, 'n_process': args.n_process
+    }).get_json()
+    elapsed = time.perf_counter() - start
+    print(f'bulk /regrade         : {elapsed:7.2f}s ({n / elapsed:8.1f} submissions/s) -> {res}')
+
+
+if __name__ == '__main__':
+    main()
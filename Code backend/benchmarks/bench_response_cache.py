@@ -0,0 +1,96 @@
+# Học sinh poll GET /essays/<id>, GET /essays, /assignments/for_student: không cache, có cache,
+# và có cache + If-None-Match (304, không gửi lại body); kiểm tra sửa đề/assignment thì output đổi ngay
+# Chạy: python benchmarks/bench_response_cache.py --essays 1000 --polls 2000
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import generate_criteria
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--essays', type=int, default=1000)
+    parser.add_argument('--assignments', type=int, default=200)
+    parser.add_argument('--polls', type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench.db")}'
+    import app as app_module
+    from models import db, Essay, User, Assignment
+    from criteria_schema import set_essay_criteria
+    from response_cache import response_cache
+
+    app = app_module.app
+    rng = random.Random(11)
+    with app.app_context():
+        teacher = User(username='teacher', password='x', role='teacher')
+        db.session.add(teacher)
+        db.session.flush()
+        for i in range(args.essays):
+            essay = Essay(question=f'Q{i}', teacher_id=teacher.id)
+            set_essay_criteria(essay, generate_criteria(rng, 10))
+            db.session.add(essay)
+        db.session.flush()
+        for i in range(args.assignments):
+            db.session.add(Assignment(essay_id=i % args.essays + 1, teacher_id=teacher.id))
+        db.session.commit()
+        teacher_id = teacher.id
+
+    client = app.test_client()
+    paths = ['/essays', '/assignments/for_student'] + [f'/essays/{i}' for i in range(1, 21)]
+    polls = [rng.choice(paths) for _ in range(args.polls)]
+
+    def run(conditional):
+        etags = {}
+        not_modified = 0
+        start = time.perf_counter()
+        for path in polls:
+            headers = {'If-None-Match': etags[path]} if conditional and path in etags else {}
+            res = client.get(path, headers=headers)
+            if res.status_code == 304:
+                not_modified += 1
+            elif res.headers.get('ETag'):
+                etags[path] = res.headers['ETag']
+        return (time.perf_counter() - start) / len(polls), not_modified
+
+    response_cache.enabled = False
+    uncached, _ = run(False)
+    response_cache.enabled = True
+    response_cache.clear()
+    cached, _ = run(False)
+    conditional, not_modified = run(True)
+    print(f'{args.essays} essays, {args.assignments} assignments, {args.polls} polls over {len(paths)} URLs')
+    print(f'no cache               : {uncached * 1000:7.2f} ms/request')
+    print(f'cache                  : {cached * 1000:7.2f} ms/request ({uncached / cached:.1f}x)')
+    print(f'cache + If-None-Match  : {conditional * 1000:7.2f} ms/request ({uncached / conditional:.1f}x, '
+          f'{not_modified} x 304)')
+    print(f'stats                  : {response_cache.stats()}')
+
+    # Ghi -> lần đọc tiếp theo thấy dữ liệu mới, ETag cũ không còn khớp
+    ok = True
+    auth = {'user_id': teacher_id}
+    etag = client.get('/essays/1').headers['ETag']
+    client.put('/essays/1', json={**auth, 'question': 'Changed'})
+    res = client.get('/essays/1', headers={'If-None-Match': etag})
+    ok &= res.status_code == 200 and res.get_json()['question'] == 'Changed'
+    ok &= any(e['question'] == 'Changed' for e in client.get('/essays').get_json())
+    ok &= any(a['question'] == 'Changed' for a in client.get('/assignments/for_student').get_json())
+    before = len(client.get('/assignments/for_student').get_json())
+    client.post('/assignments', json={**auth, 'essay_id': 2})
+    ok &= len(client.get('/assignments/for_student').get_json()) == before + 1
+    last = f'/essays/{args.essays}'
+    client.get(last)
+    client.delete(last, json=auth)
+    ok &= client.get(last).status_code == 404
+    print(f'invalidation on writes : {"ok" if ok else "FAILED"}')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
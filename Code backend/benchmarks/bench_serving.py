@@ -0,0 +1,172 @@
+# So sánh server dev (werkzeug, 1 process nhiều thread) với gunicorn nhiều worker (wsgi.py + gunicorn.conf.py):
+# requests/giây khi nhiều client cùng nộp bài (chấm ngay trong request) + đọc đề, và bộ nhớ từng process
+# RSS = bộ nhớ process đang dùng (tính cả trang dùng chung), PSS = chia đều trang dùng chung cho các process
+# gunicorn-nopreload: mỗi worker tự load model sau fork (không dùng chung trang nhớ) để so sánh
+# Cần Linux (/proc) và gunicorn. Chạy: python benchmarks/bench_serving.py --workers 4 --clients 16
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.corpus import generate_essay
+
+DEV_SERVER = '''
+import sys
+from werkzeug.serving import run_simple
+import app as app_module
+run_simple('127.0.0.1', int(sys.argv[1]), app_module.app, threaded=True)
+'''
+
+
+def request(base, path, payload=None):
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(base + path, data=data, headers={'Content-Type': 'application/json'},
+                                 method='POST' if data else 'GET')
+    try:
+        with urllib.request.urlopen(req, timeout=120) as res:
+            res.read()
+            return res.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def children(pid):
+    result = []
+    for name in os.listdir('/proc'):
+        if name.isdigit():
+            try:
+                with open(f'/proc/{name}/stat') as f:
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        result.append(int(name))
+            except (OSError, IndexError, ValueError):
+                pass
+    return result
+
+
+def memory(pid):
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                values[parts[0][:-1]] = int(parts[1]) / 1024
+    return values.get('Rss', 0), values.get('Pss', 0)
+
+
+def start_server(mode, port, args, env):
+    if mode == 'dev':
+        return subprocess.Popen([sys.executable, '-c', DEV_SERVER, str(port)], cwd=BACKEND_DIR, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    env = dict(env, WEB_BIND=f'127.0.0.1:{port}', WEB_WORKERS=str(args.workers), WEB_THREADS=str(args.threads),
+               PRELOAD_NLP='0' if mode == 'gunicorn-nopreload' else '1')
+    return subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def run(mode, args):
+    env = dict(os.environ,
+               DATABASE_URL=f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench.db")}',
+               GRADING_ASYNC='0', GRADING_CACHE_SIZE='0', RESPONSE_CACHE_ENABLED='0', DRAFT_FLUSH_INTERVAL='0',
+               RATE_LIMIT_ENABLED='0', GRADING_MAX_INFLIGHT='0', SECRET_KEY='bench-secret')
+    port = free_port()
+    base = f'http://127.0.0.1:{port}'
+    server = start_server(mode, port, args, env)
+    try:
+        deadline = time.monotonic() + 120
+        while request(base, '/essays') != 200:
+            if server.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f'{mode}: server did not start')
+            time.sleep(0.2)
+        request(base, '/register', {'username': 'teacher', 'password': 'x', 'role': 'teacher'})
+        request(base, '/essays', {'user_id': 1, 'question': 'Q', 'criteria': [
+            {'type': 'min_words', 'count': 200}, {'type': 'max_sentences', 'count': 40},
+            {'type': 'contains', 'phrase': 'energy'},
+        ]})
+        rng = random.Random(4)
+        texts = [generate_essay(rng, args.words) for _ in range(50)]
+
+        def client(n):
+            statuses = []
+            for i in range(args.requests):
+                if i % 4 == 3:
+                    statuses.append(request(base, '/essays/1'))
+                else:
+                    statuses.append(request(base, '/essays/1/submissions', {
+                        'student_id': 1000 + n * args.requests + i, 'content': texts[(n + i) % len(texts)]}))
+            return statuses
+
+        # Làm nóng: mọi worker đều đã load model trước khi đo
+        with ThreadPoolExecutor(args.clients) as pool:
+            list(pool.map(client, range(args.clients)))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.clients) as pool:
+            statuses = [s for r in pool.map(client, range(args.clients, 2 * args.clients)) for s in r]
+        elapsed = time.perf_counter() - start
+
+        pids = [server.pid] if mode == 'dev' else children(server.pid)
+        usage = [memory(pid) for pid in pids]
+        master = memory(server.pid) if mode != 'dev' else None
+        return {
+            'mode': mode,
+            'processes': len(pids),
+            'requests_per_second': round(len(statuses) / elapsed, 1),
+            'errors': sum(1 for s in statuses if s != 200),
+            'rss_mb_per_worker': round(sum(rss for rss, _ in usage) / len(usage), 1),
+            'pss_mb_per_worker': round(sum(pss for _, pss in usage) / len(usage), 1),
+            'total_pss_mb': round(sum(pss for _, pss in usage) + (master[1] if master else 0), 1),
+        }
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modes', nargs='+', default=['dev', 'gunicorn', 'gunicorn-nopreload'],
+                        choices=['dev', 'gunicorn', 'gunicorn-nopreload'])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=40, help='số request mỗi client')
+    parser.add_argument('--words', type=int, default=400)
+    args = parser.parse_args()
+
+    if any(m.startswith('gunicorn') for m in args.modes):
+        try:
+            import gunicorn
+        except ImportError:
+            sys.exit('gunicorn is not installed (pip install gunicorn)')
+
+    print(f'{"mode":20s} {"procs":>5s} {"req/s":>8s} {"errors":>6s} {"RSS/worker":>11s} '
+          f'{"PSS/worker":>11s} {"total PSS":>10s}')
+    for mode in args.modes:
+        r = run(mode, args)
+        print(f'{r["mode"]:20s} {r["processes"]:5d} {r["requests_per_second"]:8.1f} {r["errors"]:6d} '
+              f'{r["rss_mb_per_worker"]:8.1f} MB {r["pss_mb_per_worker"]:8.1f} MB {r["total_pss_mb"]:7.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
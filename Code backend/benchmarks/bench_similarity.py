@@ -0,0 +1,88 @@
+# Phát hiện bài giống nhau cho 1 lớp: index TF-IDF + nhân ma trận thưa so với so sánh từng cặp bằng vòng lặp Python
+# Cài sẵn một số cặp chép bài (sửa vài từ) và kiểm tra đều được tìm thấy
+# Chạy: python benchmarks/bench_similarity.py --submissions 1000
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import generate_essay, WORDS
+from similarity import EssayIndex, WORD_RE
+
+
+def copy_with_edits(rng, text, edits):
+    words = text.split(' ')
+    for _ in range(edits):
+        words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return ' '.join(words)
+
+
+def shingles(text, k=3):
+    tokens = WORD_RE.findall(text.lower())
+    return {tuple(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+
+
+# Cách làm thủ công: Jaccard của tập shingle cho từng cặp (O(n^2) vòng lặp Python)
+def naive_pairs(texts, threshold):
+    sets = [shingles(t) for t in texts]
+    pairs = []
+    for i in range(len(sets)):
+        for j in range(i + 1, len(sets)):
+            union = len(sets[i] | sets[j])
+            if union and len(sets[i] & sets[j]) / union >= threshold:
+                pairs.append((i, j))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--submissions', type=int, default=1000)
+    parser.add_argument('--words', type=int, default=400)
+    parser.add_argument('--copies', type=int, default=20)
+    parser.add_argument('--threshold', type=float, default=0.5)
+    parser.add_argument('--naive-sample', type=int, default=200, help='số bài dùng để đo cách so từng cặp')
+    args = parser.parse_args()
+
+    rng = random.Random(9)
+    texts = [generate_essay(rng, args.words) for _ in range(args.submissions - args.copies)]
+    planted = set()
+    for _ in range(args.copies):
+        source = rng.randrange(len(texts))
+        planted.add((source, len(texts)))
+        texts.append(copy_with_edits(rng, texts[source], args.words // 20))
+
+    start = time.perf_counter()
+    index = EssayIndex(3)
+    for i, text in enumerate(texts):
+        index.add(i, i, text)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    pairs = index.similar_pairs(args.threshold, limit=10 * args.copies)
+    query = time.perf_counter() - start
+    index.add(len(texts), len(texts), generate_essay(rng, args.words))
+    start = time.perf_counter()
+    index.similar_pairs(args.threshold, limit=10 * args.copies)
+    incremental = time.perf_counter() - start
+    found = {(p['submission_a'], p['submission_b']) for p in pairs}
+
+    sample = texts[:args.naive_sample]
+    start = time.perf_counter()
+    naive_pairs(sample, args.threshold)
+    naive = time.perf_counter() - start
+    naive_full = naive * (args.submissions / len(sample)) ** 2
+
+    print(f'{args.submissions} submissions x ~{args.words} words')
+    print(f'index build (shingling)      : {build * 1000:8.1f} ms')
+    print(f'similar pairs (sparse matmul): {query * 1000:8.1f} ms')
+    print(f'after 1 new submission       : {incremental * 1000:8.1f} ms')
+    print(f'naive pairwise Jaccard       : {naive_full * 1000:8.1f} ms (extrapolated from {len(sample)} submissions)')
+    print(f'planted copies found         : {len(planted & found)}/{len(planted)}, '
+          f'other pairs above threshold: {len(found - planted)}')
+    sys.exit(0 if planted <= found else 1)
+
+
+if __name__ == '__main__':
+    main()
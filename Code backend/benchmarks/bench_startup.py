@@ -0,0 +1,57 @@
+# Đo thời gian khởi động và độ trễ chấm 1 bài: pipeline spaCy đầy đủ so với chỉ tokenizer
+# Mỗi cấu hình chạy trong process riêng để đo đúng thời gian import/load model
+# Chạy: python benchmarks/bench_startup.py --essays 200
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import grading
+t_import = time.perf_counter() - t0
+t0 = time.perf_counter()
+grading.load_nlp()
+t_load = time.perf_counter() - t0
+text = ("Climate change is driven by greenhouse gases. If emissions grow by 2 + 3 percent "
+        "each year, the effect compounds quickly. ") * 40
+with_words = json.dumps([{"type": "contains", "phrase": "climate change"}, {"type": "min_words", "count": 150}])
+no_words = json.dumps([{"type": "contains", "phrase": "climate change"}, {"type": "has_calculation"}])
+n = int(sys.argv[1])
+result = {"import_s": t_import, "load_model_s": t_load}
+for name, criteria in (("min_words", with_words), ("no_token_rules", no_words)):
+    grading.grade_essay(text, criteria)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        grading.grade_essay(text, criteria)
+    result[name + "_ms"] = (time.perf_counter() - t0) / n * 1000
+print(json.dumps(result))
+'''
+
+
+def run(n, exclude=None):
+    env = dict(os.environ)
+    if exclude is not None:
+        env['SPACY_EXCLUDE'] = exclude
+    out = subprocess.run([sys.executable, '-c', CHILD, str(n)], cwd=BACKEND_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--essays', type=int, default=200)
+    args = parser.parse_args()
+    for label, exclude in (('full pipeline', ''), ('tokenizer only', None)):
+        r = run(args.essays, exclude)
+        print(f'{label:15s}: import {r["import_s"] * 1000:7.1f} ms, load model {r["load_model_s"] * 1000:7.1f} ms, '
+              f'grade (min_words) {r["min_words_ms"]:6.2f} ms/essay, '
+              f'grade (no token rules) {r["no_token_rules_ms"]:6.2f} ms/essay')
+
+
+if __name__ == '__main__':
+    main()
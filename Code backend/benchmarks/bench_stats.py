@@ -0,0 +1,116 @@
+# Thống kê điểm 1 đề: đọc bảng thống kê cộng dồn (GET /essays/<id>/stats) so với
+# tải toàn bộ bài nộp (GET /essays/<id>/submissions) rồi tự tính phía client như trước
+# Đồng thời kiểm tra số liệu cộng dồn khớp với tính lại từ đầu sau một loạt chấm/sửa điểm
+# Chạy: python benchmarks/bench_stats.py --submissions 10000
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed(app_module, n_submissions, rng):
+    from models import db, User, Essay, Submission
+    from score_stats import rebuild_essay_stats
+    with app_module.app.app_context():
+        teacher = User(username='teacher', password='x', role='teacher')
+        db.session.add(teacher)
+        db.session.flush()
+        essay = Essay(question='Bench', criteria='[]', teacher_id=teacher.id)
+        db.session.add(essay)
+        db.session.flush()
+        db.session.execute(db.insert(Submission), [{
+            'essay_id': essay.id, 'student_id': teacher.id, 'content': 'lorem ipsum ' * 200,
+            'suggested_score': round(rng.uniform(0, 10), 2),
+            'final_score': round(rng.uniform(0, 10), 2) if rng.random() < 0.5 else None,
+        } for _ in range(n_submissions)])
+        rebuild_essay_stats(db.session, essay.id)
+        db.session.commit()
+        return teacher.id, essay.id
+
+
+def timed(n, fn):
+    start = time.perf_counter()
+    for _ in range(n):
+        res = fn()
+    return (time.perf_counter() - start) / n * 1000, res
+
+
+def client_side_stats(rows):
+    scores = [r['final_score'] if r['final_score'] is not None else r['suggested_score'] for r in rows]
+    scores = [s for s in scores if s is not None]
+    return {'count': len(rows), 'mean': statistics.fmean(scores), 'variance': statistics.pvariance(scores)}
+
+
+# Chấm/sửa điểm ngẫu nhiên qua API rồi so số liệu cộng dồn với rebuild_essay_stats
+def check_incremental(app_module, client, essay_id, teacher_id, rng, n_changes):
+    from models import db, Submission
+    from score_stats import read_essay_stats, rebuild_essay_stats
+    with app_module.app.app_context():
+        ids = [row.id for row in db.session.query(Submission.id).filter_by(essay_id=essay_id)]
+    for _ in range(n_changes):
+        sid = rng.choice(ids)
+        if rng.random() < 0.5:
+            client.post(f'/submissions/{sid}/grade')
+        else:
+            client.post(f'/submissions/{sid}/feedback', json={'final_score': round(rng.uniform(0, 10), 2)})
+    client.post(f'/essays/{essay_id}/submissions', json={'student_id': teacher_id, 'content': 'new essay'})
+    with app_module.app.app_context():
+        incremental = read_essay_stats(db.session, essay_id, 5)
+        rebuild_essay_stats(db.session, essay_id)
+        rebuilt = read_essay_stats(db.session, essay_id, 5)
+        db.session.rollback()
+    incremental.pop('updated_at')
+    rebuilt.pop('updated_at')
+    return same(incremental, rebuilt), incremental, rebuilt
+
+
+# So sánh 2 kết quả, cho phép sai số làm tròn của phép cộng/trừ dồn số thực
+def same(a, b):
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) and isinstance(b, float):
+        return abs(a - b) <= 1e-6 * max(1.0, abs(a), abs(b))
+    return a == b
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--submissions', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--changes', type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench.db")}'
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    os.environ['GRADING_ASYNC'] = '0'
+    import app as app_module
+    rng = random.Random(5)
+    teacher_id, essay_id = seed(app_module, args.submissions, rng)
+    client = app_module.app.test_client()
+
+    stats_ms, res = timed(args.requests, lambda: client.get(f'/essays/{essay_id}/stats?user_id={teacher_id}'))
+    stats_queries = res.headers['X-Query-Count']
+    list_ms, res = timed(max(1, args.requests // 4), lambda: client_side_stats(
+        client.get(f'/essays/{essay_id}/submissions').get_json()))
+    print(f'{args.submissions} submissions')
+    print(f'GET /stats (materialized)   : {stats_ms:8.2f} ms/request, {stats_queries} queries')
+    print(f'list + client-side compute  : {list_ms:8.2f} ms/request')
+
+    ok, incremental, rebuilt = check_incremental(app_module, client, essay_id, teacher_id, rng, args.changes)
+    print(f'incremental == rebuild after {args.changes} changes: {"OK" if ok else "MISMATCH"}')
+    if not ok:
+        print(json.dumps(incremental, indent=2, default=str))
+        print(json.dumps(rebuilt, indent=2, default=str))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
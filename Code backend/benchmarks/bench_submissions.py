@@ -0,0 +1,65 @@
+# Benchmark: so sánh số bài nộp/giây giữa chấm inline và chấm qua hàng đợi
+# Chạy: python benchmarks/bench_submissions.py --submissions 200 --workers 4
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ESSAY_TEXT = (
+    "Climate change is driven by greenhouse gases. If emissions grow by 2 + 3 percent "
+    "each year, the effect compounds quickly. "
+) * 40
+
+
+def setup(client):
+    client.post('/register', json={'username': 'bench_teacher', 'password': 'x', 'role': 'teacher'})
+    teacher = client.post('/login', json={'username': 'bench_teacher', 'password': 'x'}).get_json()
+    criteria = [
+        {'type': 'contains', 'phrase': 'climate change', 'deduct': 2},
+        {'type': 'min_words', 'count': 150, 'deduct': 1.5},
+        {'type': 'has_calculation', 'deduct': 1},
+    ]
+    res = client.post('/essays', json={'user_id': teacher['id'], 'question': 'Bench', 'criteria': criteria})
+    return res.get_json()['essay_id']
+
+
+def run(app_module, client, essay_id, n, use_queue):
+    app_module.app.config['GRADING_ASYNC'] = use_queue
+    start = time.perf_counter()
+    for i in range(n):
+        client.post(f'/essays/{essay_id}/submissions', json={'student_id': 1000 + i, 'content': ESSAY_TEXT})
+    accepted = time.perf_counter() - start
+    if use_queue:
+        app_module.grading_queue.join()
+    total = time.perf_counter() - start
+    return accepted, total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--submissions', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    os.environ['GRADING_WORKERS'] = str(args.workers)
+    import app as app_module
+
+    client = app_module.app.test_client()
+    essay_id = setup(client)
+    n = args.submissions
+
+    accepted, total = run(app_module, client, essay_id, n, use_queue=False)
+    print(f'inline : {n / accepted:8.1f} submissions/s accepted, {n / total:8.1f} graded/s')
+    accepted, total = run(app_module, client, essay_id, n, use_queue=True)
+    print(f'queued : {n / accepted:8.1f} submissions/s accepted, {n / total:8.1f} graded/s '
+          f'({args.workers} workers)')
+
+
+if __name__ == '__main__':
+    main()
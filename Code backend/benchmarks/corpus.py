@@ -0,0 +1,73 @@
+# Sinh bài luận + tiêu chí tổng hợp, tất định theo seed (cùng seed -> cùng dữ liệu)
+import json
+import random
+
+WORDS = (
+    'climate change energy renewable solar wind carbon emissions policy economy growth '
+    'population health education technology innovation water food agriculture industry '
+    'transport city government market research data evidence impact future society '
+    'student learning community resource global local temperature ocean forest species '
+    'reduce increase improve support develop protect analyse compare measure estimate'
+).split()
+CONNECTORS = ['because', 'however', 'therefore', 'moreover', 'although', 'while', 'since', 'and', 'but']
+OPERATORS = ['+', '-', '*', '/']
+RULE_TYPES = ('contains', 'min_words', 'has_calculation')
+# Các loại rule cần Doc (đếm câu, tần suất từ, lemma...) dùng chung 1 lần duyệt token
+TOKEN_RULE_TYPES = ('max_words', 'min_sentences', 'max_paragraphs', 'keyword_frequency',
+                    'lemma_contains', 'forbidden_words')
+
+
+def generate_sentence(rng, calculation=False):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(6, 16))]
+    words.insert(rng.randint(1, len(words) - 1), rng.choice(CONNECTORS))
+    if calculation:
+        words.append(f'{rng.randint(1, 999)} {rng.choice(OPERATORS)} {rng.randint(1, 999)}')
+    return ' '.join(words).capitalize() + '.'
+
+
+# Bài luận khoảng n_words từ, chia đoạn, có thể có phép tính
+def generate_essay(rng, n_words, calculation_rate=0.05):
+    sentences = []
+    count = 0
+    while count < n_words:
+        sentence = generate_sentence(rng, calculation=rng.random() < calculation_rate)
+        sentences.append(sentence)
+        count += len(sentence.split())
+    paragraphs = []
+    while sentences:
+        size = rng.randint(3, 6)
+        paragraphs.append(' '.join(sentences[:size]))
+        sentences = sentences[size:]
+    return '\n\n'.join(paragraphs)
+
+
+# Tiêu chí gồm n_rules rule, chọn ngẫu nhiên trong rule_types
+def generate_criteria(rng, n_rules, rule_types=RULE_TYPES):
+    criteria = []
+    for _ in range(n_rules):
+        rule_type = rng.choice(rule_types)
+        deduct = rng.choice([0.25, 0.5, 1, 1.5, 2])
+        if rule_type == 'contains':
+            phrase = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 2)))
+            criteria.append({'type': 'contains', 'phrase': phrase, 'deduct': deduct})
+        elif rule_type in ('min_words', 'max_words'):
+            criteria.append({'type': rule_type, 'count': rng.choice([100, 250, 500, 1000]), 'deduct': deduct})
+        elif rule_type in ('min_sentences', 'max_sentences', 'min_paragraphs', 'max_paragraphs'):
+            criteria.append({'type': rule_type, 'count': rng.randint(1, 40), 'deduct': deduct})
+        elif rule_type == 'keyword_frequency':
+            criteria.append({'type': rule_type, 'keyword': rng.choice(WORDS), 'min_count': rng.randint(1, 5),
+                             'deduct': deduct})
+        elif rule_type == 'lemma_contains':
+            criteria.append({'type': rule_type, 'lemma': rng.choice(WORDS), 'deduct': deduct})
+        elif rule_type == 'forbidden_words':
+            criteria.append({'type': rule_type, 'words': rng.sample(WORDS, 3), 'deduct': deduct})
+        else:
+            criteria.append({'type': rule_type, 'deduct': deduct})
+    return criteria
+
+
+# Danh sách (content, criteria_json) cho microbenchmark
+def generate_corpus(seed, n_essays, n_words, n_rules, rule_types=RULE_TYPES):
+    rng = random.Random(seed)
+    criteria_json = json.dumps(generate_criteria(rng, n_rules, rule_types))
+    return [(generate_essay(rng, n_words), criteria_json) for _ in range(n_essays)]
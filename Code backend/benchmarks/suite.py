@@ -0,0 +1,168 @@
+# Bộ benchmark chính: microbenchmark grade_essay + end-to-end qua Flask test client
+# Lưu kết quả JSON, so với baseline và thoát mã lỗi 1 nếu chậm hơn ngưỡng cho phép
+# Chạy (trong thư mục Code backend):
+#   python -m benchmarks.suite --output bench.json
+#   python -m benchmarks.suite --baseline bench.json --threshold 0.2
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import generate_corpus, generate_essay, generate_criteria, TOKEN_RULE_TYPES
+
+ESSAY_LENGTHS = {'short': 150, 'medium': 600, 'long': 2000}
+RULE_COUNTS = (3, 20, 100)
+RULE_MIXES = {
+    'mixed': ('contains', 'min_words', 'has_calculation'),
+    'contains_only': ('contains',),
+    'token_level': TOKEN_RULE_TYPES,
+}
+
+
+def summarize(samples_ms):
+    samples_ms = sorted(samples_ms)
+    return {
+        'runs': len(samples_ms),
+        'median_ms': statistics.median(samples_ms),
+        'p95_ms': samples_ms[max(0, int(len(samples_ms) * 0.95) - 1)],
+        'mean_ms': statistics.fmean(samples_ms),
+    }
+
+
+def measure(fn, items, repeat):
+    samples = []
+    for _ in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def micro_benchmarks(seed, n_essays, repeat):
+    from grading import grade_essay, load_nlp
+    from criteria_engine import criteria_cache
+    from result_cache import result_cache
+
+    load_nlp()
+    # Đo chi phí chấm thật: tắt cache kết quả
+    result_cache.configure(maxsize=0, store=None)
+    results = {}
+    for length_name, n_words in ESSAY_LENGTHS.items():
+        for n_rules in RULE_COUNTS:
+            for mix_name, rule_types in RULE_MIXES.items():
+                corpus = generate_corpus(seed, n_essays, n_words, n_rules, rule_types)
+                criteria_cache.clear()
+                name = f'grade_essay/{length_name}/{n_rules}_rules/{mix_name}'
+                results[name] = measure(lambda item: grade_essay(item[0], item[1], essay_id=1), corpus, repeat)
+    return results
+
+
+def e2e_benchmarks(seed, n_submissions, repeat):
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench.db")}'
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    os.environ['GRADING_ASYNC'] = '0'
+    import app as app_module
+    from result_cache import result_cache
+
+    result_cache.configure(maxsize=0, store=None)
+    rng = random.Random(seed)
+    client = app_module.app.test_client()
+    client.post('/register', json={'username': 'teacher', 'password': 'x', 'role': 'teacher'})
+    token = client.post('/login', json={'username': 'teacher', 'password': 'x'}).get_json()['token']
+    auth = {'Authorization': f'Bearer {token}'}
+    essay_id = client.post('/essays', headers=auth, json={
+        'question': 'Benchmark question', 'criteria': generate_criteria(rng, 10)
+    }).get_json()['essay_id']
+    essays = [generate_essay(rng, 600) for _ in range(n_submissions)]
+
+    student = iter(range(10000, 10000 + n_submissions * repeat))
+    submission_ids = []
+
+    def submit(content):
+        res = client.post(f'/essays/{essay_id}/submissions', json={'student_id': next(student), 'content': content})
+        submission_ids.append(res.get_json()['submission_id'])
+
+    results = {'e2e/submit': measure(submit, essays, repeat)}
+    results['e2e/list_submissions'] = measure(
+        lambda _: client.get(f'/essays/{essay_id}/submissions'), range(20), repeat)
+    results['e2e/list_submissions_paged'] = measure(
+        lambda _: client.get(f'/essays/{essay_id}/submissions?fields=id,student_name,suggested_score&limit=50'),
+        range(20), repeat)
+    results['e2e/grade'] = measure(
+        lambda sid: client.post(f'/submissions/{sid}/grade'), submission_ids[:n_submissions], repeat)
+    return results
+
+
+# So sánh median với baseline, trả về danh sách benchmark bị chậm hơn ngưỡng
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        ratio = current['median_ms'] / base['median_ms'] if base['median_ms'] else 1.0
+        current['baseline_median_ms'] = base['median_ms']
+        current['ratio'] = ratio
+        if ratio > 1 + threshold:
+            regressions.append((name, base['median_ms'], current['median_ms'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--essays', type=int, default=20, help='số bài mỗi case microbenchmark')
+    parser.add_argument('--submissions', type=int, default=50, help='số bài nộp cho benchmark end-to-end')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', choices=['micro', 'e2e'])
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help='file JSON kết quả trước đó để so sánh')
+    parser.add_argument('--threshold', type=float, default=0.2, help='cho phép chậm hơn baseline tối đa (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    results = {}
+    if args.only in (None, 'micro'):
+        results.update(micro_benchmarks(args.seed, args.essays, args.repeat))
+    if args.only in (None, 'e2e'):
+        results.update(e2e_benchmarks(args.seed, args.submissions, args.repeat))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    for name, r in results.items():
+        extra = f'  ({r["ratio"]:.2f}x baseline)' if 'ratio' in r else ''
+        print(f'{name:48s} median {r["median_ms"]:8.3f} ms  p95 {r["p95_ms"]:8.3f} ms{extra}')
+    print(f'Results saved to {args.output}')
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) above {args.threshold:.0%}:')
+        for name, base, current, ratio in regressions:
+            print(f'  {name}: {base:.3f} ms -> {current:.3f} ms ({ratio:.2f}x)')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
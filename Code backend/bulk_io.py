@@ -0,0 +1,278 @@
+import csv
+import io
+import json
+import time
+from sqlalchemy import select, insert, delete
+from models import db, User, Submission, EssayDraft
+from grading import grade_essays
+from score_stats import record_score_changes
+from draft_buffer import draft_buffer
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_FORMATS = ('csv', 'parquet')
+EXPORT_COLUMNS = ['id', 'essay_id', 'student_id', 'student_name', 'suggested_score', 'final_score', 'feedback']
+MAX_REPORTED_ERRORS = 100
+
+
+class BulkImportError(ValueError):
+    pass
+
+
+# Đoán định dạng từ tham số format, tên file hoặc content type
+def detect_format(fmt=None, filename=None, content_type=None):
+    if fmt:
+        fmt = fmt.lower()
+    elif filename and filename.lower().endswith(('.jsonl', '.ndjson')):
+        fmt = 'jsonl'
+    elif content_type and 'ndjson' in content_type:
+        fmt = 'jsonl'
+    else:
+        fmt = 'csv'
+    if fmt not in IMPORT_FORMATS:
+        raise BulkImportError(f'Unsupported import format: {fmt}')
+    return fmt
+
+
+# Đọc file (binary stream) từng dòng -> yield (số dòng, dict); không đọc cả file vào bộ nhớ
+# Mỗi dòng cần content và student_id hoặc username
+def read_rows(stream, fmt):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        # Dòng 1 là header
+        for line_no, row in enumerate(csv.DictReader(text), start=2):
+            yield line_no, row
+    else:
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                yield line_no, None
+                continue
+            yield line_no, row if isinstance(row, dict) else None
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Import bài nộp cho 1 đề: mỗi batch tra username 1 query, chấm qua grade_essays (nlp.pipe),
+# insert bằng executemany, cập nhật thống kê 1 lần rồi commit
+# Bỏ qua kiểm tra deadline (giáo viên import sau giờ thi); dòng lỗi bị bỏ qua và báo lại
+def import_submissions(essay, rows, batch_size=500, grade=True, nlp_batch_size=64):
+    start = time.perf_counter()
+    imported = graded = skipped = 0
+    errors = []
+
+    def reject(line_no, message):
+        nonlocal skipped
+        skipped += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'line': line_no, 'error': message})
+
+    for batch in batched(rows, batch_size):
+        usernames = {str(row['username']) for _, row in batch
+                     if row and not row.get('student_id') and row.get('username')}
+        user_ids = {}
+        if usernames:
+            user_ids = dict(db.session.execute(
+                select(User.username, User.id).where(User.username.in_(usernames))
+            ).all())
+
+        records = []
+        for line_no, row in batch:
+            if not row:
+                reject(line_no, 'Invalid row')
+                continue
+            content = row.get('content')
+            if not content:
+                reject(line_no, 'Missing content')
+                continue
+            student_id = row.get('student_id') or user_ids.get(str(row.get('username')))
+            try:
+                student_id = int(student_id)
+            except (TypeError, ValueError):
+                reject(line_no, 'Missing or unknown student')
+                continue
+            records.append({
+                'essay_id': essay.id,
+                'student_id': student_id,
+                'content': content,
+                'suggested_score': None,
+                'final_score': None,
+                'feedback': None,
+            })
+        if not records:
+            continue
+
+        if grade:
+            items = ((record['content'], i) for i, record in enumerate(records))
+            for i, score, reasons in grade_essays(items, essay.criteria, batch_size=nlp_batch_size,
+                                                  essay_id=essay.id, criteria_hash=essay.criteria_hash):
+                records[i]['suggested_score'] = score
+                records[i]['feedback'] = "; ".join(reasons) if reasons else "Good job!"
+            graded += len(records)
+
+        db.session.execute(insert(Submission), records)
+        record_score_changes(db.session, essay.id, [
+            (None, (record['suggested_score'], None)) for record in records
+        ])
+        # Giống nộp từng bài: xóa nháp của các học sinh vừa có bài
+        student_ids = {record['student_id'] for record in records}
+        db.session.execute(delete(EssayDraft).where(
+            EssayDraft.essay_id == essay.id, EssayDraft.student_id.in_(student_ids)
+        ))
+        db.session.commit()
+        for student_id in student_ids:
+            draft_buffer.discard(essay.id, student_id)
+        imported += len(records)
+
+    elapsed = time.perf_counter() - start
+    return {
+        'imported': imported,
+        'graded': graded,
+        'skipped': skipped,
+        'errors': errors,
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(imported / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def export_query(essay_id):
+    return db.session.query(
+        Submission.id.label('id'),
+        Submission.essay_id.label('essay_id'),
+        Submission.student_id.label('student_id'),
+        User.username.label('student_name'),
+        Submission.suggested_score.label('suggested_score'),
+        Submission.final_score.label('final_score'),
+        Submission.feedback.label('feedback'),
+    ).outerjoin(User, Submission.student_id == User.id).filter(
+        Submission.essay_id == essay_id
+    ).order_by(Submission.id)
+
+
+# Xuất CSV từng chunk (yield_per), bộ nhớ không tăng theo số dòng
+def export_csv(query, chunk_size=500):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    rows = 0
+    for row in query.yield_per(chunk_size):
+        writer.writerow(row)
+        rows += 1
+        if rows % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# File-like tối thiểu để ParquetWriter ghi vào, phần đã ghi được lấy ra sau mỗi row group
+class _ChunkSink(io.RawIOBase):
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+# Xuất Parquet (cần pyarrow): mỗi chunk là 1 row group, ghi ra ngay nên bộ nhớ không tăng theo số dòng
+def export_parquet(query, chunk_size=5000):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('essay_id', pa.int64()),
+        ('student_id', pa.int64()),
+        ('student_name', pa.string()),
+        ('suggested_score', pa.float64()),
+        ('final_score', pa.float64()),
+        ('feedback', pa.string()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for rows in batched(query.yield_per(chunk_size), chunk_size):
+        columns = list(zip(*rows))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+        ))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        return False
+    return True
+
+
+if __name__ == '__main__':
+    # python bulk_io.py import --essay 3 bai_nop.csv
+    # python bulk_io.py export --essay 3 --format parquet -o diem.parquet
+    import argparse
+    import sys
+    from app import app
+    from models import Essay
+
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_import = sub.add_parser('import')
+    p_import.add_argument('path')
+    p_import.add_argument('--essay', type=int, required=True)
+    p_import.add_argument('--format', choices=IMPORT_FORMATS)
+    p_import.add_argument('--batch-size', type=int, default=500)
+    p_import.add_argument('--no-grade', action='store_true')
+    p_export = sub.add_parser('export')
+    p_export.add_argument('--essay', type=int, required=True)
+    p_export.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    p_export.add_argument('-o', '--output', required=True)
+    args = parser.parse_args()
+
+    with app.app_context():
+        essay = db.session.get(Essay, args.essay)
+        if not essay:
+            sys.exit(f'Essay {args.essay} not found')
+        if args.command == 'import':
+            fmt = detect_format(args.format, args.path)
+            with open(args.path, 'rb') as f:
+                result = import_submissions(essay, read_rows(f, fmt), batch_size=args.batch_size,
+                                            grade=not args.no_grade)
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+        else:
+            query = export_query(essay.id)
+            if args.format == 'csv':
+                with open(args.output, 'w', encoding='utf-8', newline='') as f:
+                    for chunk in export_csv(query):
+                        f.write(chunk)
+            else:
+                with open(args.output, 'wb') as f:
+                    for chunk in export_parquet(query):
+                        f.write(chunk)
+            print(f'Exported essay {essay.id} to {args.output}')
@@ -0,0 +1,439 @@
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict, deque
+
+CALCULATION_RE = re.compile(r'\d+\s*[+\-*/]\s*\d+')
+# Đoạn văn ngăn cách bằng dòng trống; xuống dòng đơn (bài ngắt dòng cứng) vẫn cùng 1 đoạn
+PARAGRAPH_BREAK_RE = re.compile(r'\n\s*\n')
+
+# Phiên bản cách chấm của các rule: tăng mỗi khi đổi logic khiến cùng bài + cùng tiêu chí ra kết quả khác,
+# để kết quả chấm đã lưu (GRADING_CACHE_PERSIST) của phiên bản cũ không được dùng lại
+ENGINE_VERSION = 2
+
+# Từ số cụm từ này trở lên mới dùng automaton; ít hơn thì `in` trên chuỗi đã lower nhanh hơn
+# (đo bằng benchmarks/bench_criteria.py)
+MATCHER_MIN_PHRASES = 400
+
+
+def paragraph_count(content):
+    return sum(1 for chunk in PARAGRAPH_BREAK_RE.split(content.strip()) if chunk.strip())
+
+
+# Automaton Aho-Corasick: tìm tất cả cụm từ xuất hiện trong văn bản chỉ với 1 lần duyệt
+class PhraseMatcher:
+    def __init__(self, phrases):
+        self.phrases = set(phrases)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [frozenset()]
+        for phrase in self.phrases:
+            state = 0
+            for ch in phrase:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(frozenset())
+                    nxt = len(self._goto) - 1
+                    self._goto[state][ch] = nxt
+                state = nxt
+            self._out[state] = self._out[state] | {phrase}
+        # Tính fail link theo BFS
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for ch, nxt in self._goto[state].items():
+                pending.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] | self._out[self._fail[nxt]]
+
+    def find(self, text):
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+                if len(found) == len(self.phrases):
+                    break
+        return found
+
+
+class CriteriaError(ValueError):
+    pass
+
+
+# Feature cần spaCy Doc (tính trong 1 lần duyệt token, xem doc_features); các feature còn lại lấy từ chuỗi
+DOC_FEATURES = frozenset({'word_count', 'sentence_count', 'word_freq', 'lemmas'})
+SENTENCE_END = ('.', '!', '?')
+
+# Registry các loại tiêu chí: type -> class Rule
+RULE_TYPES = {}
+
+
+def register(rule_type):
+    def decorator(cls):
+        cls.type = rule_type
+        RULE_TYPES[rule_type] = cls
+        return cls
+    return decorator
+
+
+def _deduct(spec):
+    try:
+        deduct = float(spec.get('deduct', 0.5))
+    except (TypeError, ValueError):
+        raise CriteriaError(f"Invalid deduct for '{spec.get('type')}'")
+    if deduct < 0:
+        raise CriteriaError(f"Invalid deduct for '{spec.get('type')}'")
+    return deduct
+
+
+def _count(spec, key='count', required=True):
+    value = spec.get(key)
+    if value is None and not required:
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise CriteriaError(f"'{spec.get('type')}' needs an integer '{key}'")
+    if value < 0:
+        raise CriteriaError(f"'{spec.get('type')}' needs a non-negative '{key}'")
+    return value
+
+
+def _word(spec, key):
+    value = spec.get(key)
+    if not isinstance(value, str) or len(value.split()) != 1:
+        raise CriteriaError(f"'{spec.get('type')}' needs a single word '{key}'")
+    return value.strip().lower()
+
+
+# 1 loại tiêu chí: khai báo các feature cần dùng, kiểm tra 1 rule trên feature đã tính sẵn
+# normalize() kiểm tra + chuẩn hóa tiêu chí khi tạo/sửa đề; __init__ đọc tiêu chí đã lưu
+class Rule:
+    type = None
+    features = frozenset()
+    phrases = ()
+
+    def __init__(self, spec):
+        self.deduct = float(spec.get('deduct', 0.5))
+
+    @classmethod
+    def normalize(cls, spec):
+        return {'type': cls.type, 'deduct': _deduct(spec)}
+
+    # Trả về lý do trừ điểm, None nếu đạt
+    def check(self, features):
+        raise NotImplementedError
+
+
+@register('contains')
+class ContainsRule(Rule):
+    features = frozenset({'phrases'})
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.phrase = (spec.get('phrase') or '').lower()
+        self.phrases = (self.phrase,) if self.phrase else ()
+
+    @classmethod
+    def normalize(cls, spec):
+        phrase = spec.get('phrase') or spec.get('value')
+        if not isinstance(phrase, str) or not phrase.strip():
+            raise CriteriaError("'contains' needs a 'phrase'")
+        return {'type': cls.type, 'phrase': phrase, 'deduct': _deduct(spec)}
+
+    def check(self, features):
+        if self.phrase and self.phrase not in features['phrases']:
+            return f"Thiếu cụm từ '{self.phrase}'"
+
+
+@register('has_calculation')
+class HasCalculationRule(Rule):
+    features = frozenset({'calculation'})
+
+    def check(self, features):
+        if not features['calculation']:
+            return "Không có phép tính"
+
+
+# Giới hạn số lượng (từ, câu, đoạn): minimum=True -> trừ điểm khi ít hơn count, ngược lại khi nhiều hơn
+class CountLimitRule(Rule):
+    feature = None
+    minimum = True
+    message = None
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.count = int(spec.get('count', 0))
+        self.features = frozenset({self.feature})
+
+    @classmethod
+    def normalize(cls, spec):
+        count = _count({**spec, 'count': spec.get('count', spec.get('value'))})
+        return {'type': cls.type, 'count': count, 'deduct': _deduct(spec)}
+
+    def check(self, features):
+        value = features[self.feature]
+        if value < self.count if self.minimum else value > self.count:
+            return self.message.format(count=self.count)
+
+
+@register('min_words')
+class MinWordsRule(CountLimitRule):
+    feature = 'word_count'
+    message = "Độ dài < {count} từ"
+
+
+@register('max_words')
+class MaxWordsRule(CountLimitRule):
+    feature = 'word_count'
+    minimum = False
+    message = "Độ dài > {count} từ"
+
+
+@register('min_sentences')
+class MinSentencesRule(CountLimitRule):
+    feature = 'sentence_count'
+    message = "Ít hơn {count} câu"
+
+
+@register('max_sentences')
+class MaxSentencesRule(CountLimitRule):
+    feature = 'sentence_count'
+    minimum = False
+    message = "Nhiều hơn {count} câu"
+
+
+@register('min_paragraphs')
+class MinParagraphsRule(CountLimitRule):
+    feature = 'paragraph_count'
+    message = "Ít hơn {count} đoạn văn"
+
+
+@register('max_paragraphs')
+class MaxParagraphsRule(CountLimitRule):
+    feature = 'paragraph_count'
+    minimum = False
+    message = "Nhiều hơn {count} đoạn văn"
+
+
+# Số lần 1 từ khóa xuất hiện (không phân biệt hoa thường) phải nằm trong [min_count, max_count]
+@register('keyword_frequency')
+class KeywordFrequencyRule(Rule):
+    features = frozenset({'word_freq'})
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.keyword = (spec.get('keyword') or '').lower()
+        self.min_count = int(spec.get('min_count', 1))
+        self.max_count = int(spec['max_count']) if spec.get('max_count') is not None else None
+
+    @classmethod
+    def normalize(cls, spec):
+        min_count = _count(spec, 'min_count', required=False)
+        max_count = _count(spec, 'max_count', required=False)
+        min_count = 1 if min_count is None else min_count
+        if max_count is not None and max_count < min_count:
+            raise CriteriaError("'keyword_frequency' needs max_count >= min_count")
+        return {'type': cls.type, 'keyword': _word(spec, 'keyword'), 'min_count': min_count,
+                'max_count': max_count, 'deduct': _deduct(spec)}
+
+    def check(self, features):
+        n = features['word_freq'].get(self.keyword, 0)
+        if n < self.min_count:
+            return f"Từ khóa '{self.keyword}' xuất hiện {n} lần, cần ít nhất {self.min_count} lần"
+        if self.max_count is not None and n > self.max_count:
+            return f"Từ khóa '{self.keyword}' xuất hiện {n} lần, tối đa {self.max_count} lần"
+
+
+# Bài phải có 1 dạng bất kỳ của từ (so theo lemma: "reduce" khớp "reduces", "reduced")
+@register('lemma_contains')
+class LemmaContainsRule(Rule):
+    features = frozenset({'lemmas'})
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.lemma = (spec.get('lemma') or '').lower()
+
+    @classmethod
+    def normalize(cls, spec):
+        return {'type': cls.type, 'lemma': _word(spec, 'lemma'), 'deduct': _deduct(spec)}
+
+    def check(self, features):
+        if self.lemma and self.lemma not in features['lemmas']:
+            return f"Thiếu từ '{self.lemma}' (mọi dạng)"
+
+
+# Trừ điểm 1 lần nếu bài dùng bất kỳ từ nào trong danh sách
+@register('forbidden_words')
+class ForbiddenWordsRule(Rule):
+    features = frozenset({'word_freq'})
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.words = [w.lower() for w in spec.get('words') or []]
+
+    @classmethod
+    def normalize(cls, spec):
+        words = spec.get('words')
+        if isinstance(words, str):
+            words = words.split(',')
+        if not isinstance(words, list):
+            raise CriteriaError("'forbidden_words' needs a list of 'words'")
+        words = [_word({'type': cls.type, 'word': w}, 'word') for w in words if str(w).strip()]
+        if not words:
+            raise CriteriaError("'forbidden_words' needs a list of 'words'")
+        return {'type': cls.type, 'words': words, 'deduct': _deduct(spec)}
+
+    def check(self, features):
+        used = [w for w in self.words if w in features['word_freq']]
+        if used:
+            return f"Dùng từ không được phép: {', '.join(used)}"
+
+
+# Tính các feature cần dùng trong 1 lần duyệt Doc
+def doc_features(doc, needed):
+    words = 0
+    sentences = 0
+    in_sentence = False
+    count_sentences = 'sentence_count' in needed
+    freq = {} if 'word_freq' in needed else None
+    lemmas = set() if 'lemmas' in needed else None
+    for t in doc:
+        if t.is_alpha:
+            words += 1
+            if freq is not None:
+                freq[t.lower_] = freq.get(t.lower_, 0) + 1
+            if lemmas is not None:
+                # Pipeline không có lemmatizer thì lemma_ rỗng -> dùng chính từ đó
+                lemmas.add((t.lemma_ or t.text).lower())
+        if count_sentences and not t.is_space:
+            # Giống sentencizer của spaCy: câu kết thúc ở dấu . ! ? (không cần parser/senter)
+            if t.is_punct and t.text.endswith(SENTENCE_END):
+                if in_sentence:
+                    sentences += 1
+                in_sentence = False
+            else:
+                in_sentence = True
+    features = {'word_count': words}
+    if count_sentences:
+        features['sentence_count'] = sentences + (1 if in_sentence else 0)
+    if freq is not None:
+        features['word_freq'] = freq
+    if lemmas is not None:
+        features['lemmas'] = lemmas
+    return features
+
+
+# Bộ tiêu chí đã biên dịch: parse JSON 1 lần, chuẩn bị sẵn matcher cho các rule contains
+# và hợp các feature mà mọi rule cần để chỉ tính 1 lần cho mỗi bài
+class CompiledCriteria:
+    def __init__(self, criteria):
+        self.hash = None
+        self.rules = []
+        for c in criteria:
+            cls = RULE_TYPES.get(c.get('type'))
+            if cls is not None:
+                self.rules.append(cls(c))
+        phrases = {p for rule in self.rules for p in rule.phrases}
+        self.phrases = phrases
+        self.matcher = PhraseMatcher(phrases) if len(phrases) >= MATCHER_MIN_PHRASES else None
+        self.features = frozenset().union(*(rule.features for rule in self.rules))
+        self.needs_doc = bool(self.features & DOC_FEATURES)
+        self.needs_lemmas = 'lemmas' in self.features
+
+    def found_phrases(self, content):
+        lowered = content.lower()
+        if self.matcher is not None:
+            return self.matcher.find(lowered)
+        return {p for p in self.phrases if p in lowered}
+
+    # known: feature đã tính sẵn (vd. word_count=...) thì không tính lại
+    def extract(self, content, doc=None, **known):
+        features = dict(known)
+        needed = self.features - features.keys()
+        if 'phrases' in needed:
+            features['phrases'] = self.found_phrases(content) if self.phrases else set()
+        if 'calculation' in needed:
+            features['calculation'] = CALCULATION_RE.search(content) is not None
+        if 'paragraph_count' in needed:
+            features['paragraph_count'] = paragraph_count(content)
+        if needed & DOC_FEATURES:
+            if doc is None:
+                raise ValueError('spaCy Doc is required for ' + ', '.join(sorted(needed & DOC_FEATURES)))
+            features.update(doc_features(doc, needed))
+        return features
+
+    def evaluate(self, content, doc=None, **known):
+        features = self.extract(content, doc, **known)
+        reasons = []
+        score = 10.0  # điểm tối đa
+        for rule in self.rules:
+            reason = rule.check(features)
+            if reason:
+                score -= rule.deduct
+                reasons.append(f"{reason} (-{rule.deduct} điểm)")
+        score = max(0, min(10, score))
+        return score, reasons
+
+
+def criteria_hash(criteria_json):
+    if isinstance(criteria_json, str):
+        criteria_json = criteria_json.encode('utf-8')
+    return hashlib.sha1(criteria_json).hexdigest()
+
+
+# LRU cache các bộ tiêu chí đã biên dịch, key = (essay_id, hash tiêu chí)
+class CriteriaCache:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, criteria_json, essay_id=None, hash_=None):
+        try:
+            key = (essay_id, hash_ or criteria_hash(criteria_json))
+        except Exception as e:
+            raise CriteriaError('Invalid criteria') from e
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                return compiled
+        try:
+            criteria = json.loads(criteria_json)
+        except Exception as e:
+            raise CriteriaError('Invalid criteria JSON') from e
+        try:
+            compiled = CompiledCriteria(criteria)
+        except Exception as e:
+            raise CriteriaError('Invalid criteria') from e
+        compiled.hash = key[1]
+        with self._lock:
+            self._entries[key] = compiled
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def invalidate(self, essay_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == essay_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+criteria_cache = CriteriaCache()
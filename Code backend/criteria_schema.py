@@ -0,0 +1,44 @@
+import json
+from criteria_engine import RULE_TYPES, CriteriaError, criteria_hash
+
+# Phiên bản dạng lưu của Essay.criteria: 0 = dữ liệu cũ chưa kiểm tra, 1 = đã chuẩn hóa qua registry
+SCHEMA_VERSION = 1
+
+
+# Kiểm tra + chuẩn hóa danh sách tiêu chí khi tạo/sửa đề (dùng chung cho create_essay/update_essay)
+# Mỗi loại tiêu chí tự kiểm tra qua Rule.normalize; vẫn nhận key "value" kiểu cũ cho contains/min_words
+def normalize_criteria(criteria):
+    if not isinstance(criteria, list):
+        raise CriteriaError('criteria must be a list')
+    normalized = []
+    for c in criteria:
+        if not isinstance(c, dict):
+            raise CriteriaError('Each criterion must be an object')
+        cls = RULE_TYPES.get(c.get('type'))
+        if cls is None:
+            raise CriteriaError(f"Unknown criterion type: {c.get('type')}")
+        normalized.append(cls.normalize(c))
+    return normalized
+
+
+# Ghi tiêu chí đã chuẩn hóa vào đề: JSON text + hash (key cache bộ tiêu chí đã biên dịch) + phiên bản
+def set_essay_criteria(essay, criteria):
+    essay.criteria = json.dumps(normalize_criteria(criteria), ensure_ascii=False)
+    essay.criteria_hash = criteria_hash(essay.criteria)
+    essay.criteria_version = SCHEMA_VERSION
+
+
+# Nâng cấp đề cũ (chưa có hash): chuẩn hóa nếu hợp lệ, nếu không thì giữ nguyên với version 0
+# Text không phải JSON được lưu thành chuỗi JSON để mọi Essay.criteria đều trả thẳng ra được
+def upgrade_stored_criteria(text):
+    try:
+        parsed = json.loads(text)
+    except (TypeError, ValueError):
+        stored = json.dumps(text, ensure_ascii=False)
+        return stored, criteria_hash(stored), 0
+    try:
+        stored = json.dumps(normalize_criteria(parsed), ensure_ascii=False)
+        version = SCHEMA_VERSION
+    except CriteriaError:
+        stored, version = text, 0
+    return stored, criteria_hash(stored), version
@@ -0,0 +1,47 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+SYNCHRONOUS_LEVELS = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+# SQLALCHEMY_ENGINE_OPTIONS theo loại DB
+# SQLite: busy timeout ở tầng driver; server DB (Postgres/MySQL): pool size, pre-ping, recycle
+def engine_options(config):
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if is_sqlite(uri):
+        return {'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT'] / 1000, 'check_same_thread': False}}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+
+# Đặt PRAGMA cho mỗi connection SQLite mới (WAL cho phép đọc song song khi đang ghi)
+def init_sqlite_pragmas(app, db):
+    if not is_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+    journal_mode = (app.config['SQLITE_JOURNAL_MODE'] or '').upper()
+    synchronous = (app.config['SQLITE_SYNCHRONOUS'] or '').upper()
+    if journal_mode and journal_mode not in JOURNAL_MODES:
+        raise ValueError(f'Invalid SQLITE_JOURNAL_MODE: {journal_mode}')
+    if synchronous and synchronous not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f'Invalid SQLITE_SYNCHRONOUS: {synchronous}')
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        if journal_mode:
+            cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+        if synchronous:
+            cursor.execute(f'PRAGMA synchronous={synchronous}')
+        cursor.execute(f"PRAGMA busy_timeout={int(app.config['SQLITE_BUSY_TIMEOUT'])}")
+        cursor.close()
@@ -0,0 +1,253 @@
+import threading
+import time
+from datetime import datetime
+from models import db, EssayDraft
+
+
+class DraftConflict(Exception):
+    def __init__(self, version):
+        super().__init__(f'Draft is at version {version}')
+        self.version = version
+
+
+class DraftPatchError(ValueError):
+    pass
+
+
+# Áp dụng lần lượt các patch {"start", "end", "text"}: thay đoạn content[start:end] bằng text
+def apply_patches(content, patches):
+    if not isinstance(patches, list):
+        raise DraftPatchError('patches must be a list')
+    for p in patches:
+        try:
+            start, end, new_text = int(p['start']), int(p['end']), p.get('text', '')
+        except (KeyError, TypeError, ValueError):
+            raise DraftPatchError('Each patch needs integer start/end')
+        if not isinstance(new_text, str) or not 0 <= start <= end <= len(content):
+            raise DraftPatchError('Patch range out of bounds')
+        content = content[:start] + new_text + content[end:]
+    return content
+
+
+def draft_key(essay_id, student_id):
+    try:
+        return essay_id, int(student_id)
+    except (TypeError, ValueError):
+        return essay_id, student_id
+
+
+# Bộ đệm lưu nháp: gộp các lần autosave liên tiếp trong bộ nhớ, ghi xuống DB theo chu kỳ
+# flush_interval = 0 -> ghi thẳng xuống DB mỗi lần lưu (như cũ)
+class DraftBuffer:
+    def __init__(self, app=None, flush_interval=5.0, idle_evict=600):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.idle_evict = idle_evict
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.saves = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.bytes_written = 0
+        self.conflicts = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_interval = app.config.get('DRAFT_FLUSH_INTERVAL', self.flush_interval)
+
+    def start(self):
+        with self._lock:
+            if self._thread or self.flush_interval <= 0:
+                return
+            self._thread = threading.Thread(target=self._run, name='draft-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception:
+                self.app.logger.exception('Draft flush failed')
+
+    # Lưu nháp (content đầy đủ hoặc patches theo base_version), trả về bản ghi hiện tại trong bộ nhớ
+    def save(self, essay_id, student_id, content=None, patches=None, base_version=None):
+        key = draft_key(essay_id, student_id)
+        entry = self._load(key)
+        with self._lock:
+            # Nếu entry vừa bị evict thì đưa lại vào bộ đệm
+            entry = self._entries.setdefault(key, entry)
+            if patches is not None:
+                # conflict: lần flush trước phát hiện process khác đã ghi bản mới hơn -> client phải đọc lại
+                if entry['conflict'] or base_version is None or int(base_version) != entry['version']:
+                    entry['conflict'] = False
+                    raise DraftConflict(entry['version'])
+                new_content = apply_patches(entry['content'] or '', patches)
+            else:
+                new_content = content
+                entry['full'] = True
+            entry['conflict'] = False
+            entry['content'] = new_content
+            entry['version'] += 1
+            entry['last_saved'] = datetime.utcnow()
+            entry['touched'] = time.monotonic()
+            entry['dirty'] = True
+            self.saves += 1
+            snapshot = dict(entry)
+        # Bản nháp chưa có trong DB (hoặc tắt bộ đệm) thì ghi ngay để có draft_id
+        if snapshot['id'] is None or self.flush_interval <= 0:
+            self.flush(key)
+            with self._lock:
+                current = self._entries.get(key, snapshot)
+                conflict = current['conflict']
+                current['conflict'] = False
+                snapshot = dict(current)
+                # Ghi thẳng thì không giữ lại trong bộ nhớ: nhiều worker process cùng ghi 1 nháp,
+                # lần lưu sau phải đọc version mới nhất từ DB
+                if self.flush_interval <= 0:
+                    self._entries.pop(key, None)
+            if conflict:
+                raise DraftConflict(snapshot['version'])
+        else:
+            self.start()
+        return snapshot
+
+    def get(self, essay_id, student_id):
+        key = draft_key(essay_id, student_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                return dict(entry) if entry['last_saved'] is not None else None
+        draft = EssayDraft.query.filter_by(essay_id=essay_id, student_id=student_id).first()
+        if not draft:
+            return None
+        return {'id': draft.id, 'content': draft.content, 'version': draft.version, 'last_saved': draft.last_saved}
+
+    # Bỏ bản nháp khỏi bộ đệm (khi nộp bài / xóa nháp); chờ flush đang chạy xong để không ghi lại nháp đã xóa
+    def discard(self, essay_id, student_id):
+        with self._flush_lock:
+            with self._lock:
+                self._entries.pop(draft_key(essay_id, student_id), None)
+
+    def _load(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                return entry
+        draft = EssayDraft.query.filter_by(essay_id=key[0], student_id=key[1]).first()
+        loaded = {
+            'id': draft.id if draft else None,
+            'essay_id': key[0],
+            'student_id': key[1],
+            'content': draft.content if draft else None,
+            'version': draft.version if draft else 0,
+            'last_saved': draft.last_saved if draft else None,
+            'touched': time.monotonic(),
+            'dirty': False,
+            'full': False,  # có lần lưu cả nội dung kể từ lần flush trước
+            'conflict': False,
+        }
+        with self._lock:
+            return self._entries.setdefault(key, loaded)
+
+    # Ghi các bản nháp đã thay đổi xuống DB trong 1 transaction (key=None -> tất cả)
+    # DB đã có version >= bản trong bộ nhớ (process khác vừa ghi):
+    # - có lần lưu cả nội dung -> đó là bản mới nhất của học sinh, ghi đè với version tiếp theo
+    # - chỉ có patch (áp lên nội dung cũ) -> không ghi, nạp lại bản trong DB và đánh dấu conflict để
+    #   lần lưu sau của học sinh nhận 409 và đọc lại nháp, thay vì mất bản ghi mà không báo
+    def flush(self, key=None):
+        with self._flush_lock:
+            with self._lock:
+                keys = [key] if key is not None else list(self._entries)
+                pending = [dict(self._entries[k]) for k in keys if k in self._entries and self._entries[k]['dirty']]
+                for k in keys:
+                    if k in self._entries:
+                        self._entries[k]['dirty'] = False
+                        self._entries[k]['full'] = False
+            if not pending:
+                self._evict_idle()
+                return 0
+            try:
+                ids = {}
+                shifts = {}
+                conflicts = {}
+                for entry in pending:
+                    k = (entry['essay_id'], entry['student_id'])
+                    draft = EssayDraft.query.filter_by(essay_id=entry['essay_id'], student_id=entry['student_id']).first()
+                    if not draft:
+                        draft = EssayDraft(essay_id=entry['essay_id'], student_id=entry['student_id'])
+                        db.session.add(draft)
+                    elif draft.version >= entry['version']:
+                        if not entry['full']:
+                            conflicts[k] = {'id': draft.id, 'content': draft.content, 'version': draft.version,
+                                            'last_saved': draft.last_saved}
+                            continue
+                        shifts[k] = draft.version + 1 - entry['version']
+                        entry['version'] = draft.version + 1
+                    draft.content = entry['content']
+                    draft.version = entry['version']
+                    draft.last_saved = entry['last_saved']
+                    db.session.flush()
+                    ids[(entry['essay_id'], entry['student_id'])] = draft.id
+                    self.rows_written += 1
+                    self.bytes_written += len(entry['content'] or '')
+                db.session.commit()
+                self.flushes += 1
+            except Exception:
+                db.session.rollback()
+                # Đánh dấu lại để lần flush sau ghi tiếp, không mất dữ liệu
+                with self._lock:
+                    for entry in pending:
+                        k = (entry['essay_id'], entry['student_id'])
+                        if k in self._entries:
+                            self._entries[k]['dirty'] = True
+                            self._entries[k]['full'] = self._entries[k]['full'] or entry['full']
+                raise
+            with self._lock:
+                for k, draft_id in ids.items():
+                    if k in self._entries:
+                        self._entries[k]['id'] = draft_id
+                # Các lần lưu đến sau snapshot cũng dịch version theo
+                for k, shift in shifts.items():
+                    if k in self._entries:
+                        self._entries[k]['version'] += shift
+                for k, current in conflicts.items():
+                    self.conflicts += 1
+                    entry = self._entries.get(k)
+                    if entry is not None and not entry['full']:
+                        entry.update(current, dirty=False, conflict=True)
+            self._evict_idle()
+            return len(pending)
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_evict
+        with self._lock:
+            for k in [k for k, e in self._entries.items() if not e['dirty'] and e['touched'] < cutoff]:
+                del self._entries[k]
+
+    # Ghi toàn bộ nháp còn trong bộ nhớ khi tắt server
+    def shutdown(self):
+        self._stop.set()
+        if self.app is not None:
+            with self.app.app_context():
+                self.flush()
+
+    def stats(self):
+        with self._lock:
+            dirty = sum(1 for e in self._entries.values() if e['dirty'])
+            return {
+                'saves': self.saves,
+                'flushes': self.flushes,
+                'rows_written': self.rows_written,
+                'bytes_written': self.bytes_written,
+                'buffered': len(self._entries),
+                'dirty': dirty,
+                'conflicts': self.conflicts,
+                'flush_interval': self.flush_interval,
+            }
+
+
+draft_buffer = DraftBuffer()
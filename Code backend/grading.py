@@ -1,35 +1,98 @@
-import json
-import re
-import spacy
+import os
+import threading
+from collections import deque
+from criteria_engine import criteria_cache, CriteriaError
+from result_cache import result_cache, content_hash
+from metrics import stage
 
-# Load spaCy English model (đã tải về)
-nlp = spacy.load('en_core_web_sm')
+# spaCy English model (đã tải về), chỉ load khi lần đầu cần đếm từ
+SPACY_MODEL = os.environ.get('SPACY_MODEL', 'en_core_web_sm')
+# Chấm điểm chỉ dùng t.is_alpha (thuộc tokenizer) nên mặc định bỏ hết tagger/parser/ner...
+# Đặt SPACY_EXCLUDE="" để load đầy đủ pipeline
+SPACY_EXCLUDE = [name for name in os.environ.get(
+    'SPACY_EXCLUDE', 'tok2vec,tagger,parser,senter,attribute_ruler,lemmatizer,ner'
+).split(',') if name]
+# Rule lemma_contains cần lemmatizer (kèm tagger/attribute_ruler) -> load pipeline thứ 2 khi lần đầu cần
+SPACY_LEMMA_EXCLUDE = [name for name in os.environ.get(
+    'SPACY_LEMMA_EXCLUDE', 'parser,senter,ner'
+).split(',') if name]
+
+_nlp = {}
+_nlp_lock = threading.Lock()
+
+def load_nlp(lemmas=False):
+    nlp = _nlp.get(lemmas)
+    if nlp is None:
+        with _nlp_lock:
+            nlp = _nlp.get(lemmas)
+            if nlp is None:
+                import spacy
+                nlp = _nlp[lemmas] = spacy.load(SPACY_MODEL, exclude=SPACY_LEMMA_EXCLUDE if lemmas else SPACY_EXCLUDE)
+    return nlp
 
 # criteria: list các dict, ví dụ: [{"type": "contains", "phrase": "climate change", "deduct": 2}, {"type": "min_words", "count": 150, "deduct": 1.5}]
-def grade_essay(content, criteria_json):
-    reasons = []
-    score = 10.0  # điểm tối đa
+# essay_id (nếu có) dùng làm key cache cho bộ tiêu chí đã biên dịch; criteria_hash là hash đã lưu sẵn ở Essay (bỏ qua bước tính hash)
+# Thời gian từng giai đoạn (criteria, cache_lookup, tokenize, evaluate) được ghi vào /metrics
+def grade_essay(content, criteria_json, essay_id=None, criteria_hash=None):
     try:
-        criteria = json.loads(criteria_json)
-    except:
+        with stage('criteria'):
+            compiled = criteria_cache.get(criteria_json, essay_id, criteria_hash)
+    except CriteriaError:
         return 0, ["Lỗi tiêu chí"]
-    doc = nlp(content)
-    word_count = len([t for t in doc if t.is_alpha])
-    for c in criteria:
-        deduct = float(c.get('deduct', 0.5))
-        if c.get('type') == 'contains':
-            phrase = c.get('phrase', '').lower()
-            if phrase and phrase not in content.lower():
-                score -= deduct
-                reasons.append(f"Thiếu cụm từ '{phrase}' (-{deduct} điểm)")
-        elif c.get('type') == 'min_words':
-            min_words = int(c.get('count', 0))
-            if word_count < min_words:
-                score -= deduct
-                reasons.append(f"Độ dài < {min_words} từ (-{deduct} điểm)")
-        elif c.get('type') == 'has_calculation':
-            if not re.search(r'\d+\s*[+\-*/]\s*\d+', content):
-                score -= deduct
-                reasons.append(f"Không có phép tính (-{deduct} điểm)")
-    score = max(0, min(10, score))
-    return score, reasons 
\ No newline at end of file
+    # Không có rule nào cần Doc (đếm từ/câu, tần suất từ, lemma) thì không cần tách từ
+    if not compiled.needs_doc:
+        with stage('evaluate'):
+            return compiled.evaluate(content)
+    # Bài giống hệt (cùng nội dung + cùng tiêu chí) đã chấm rồi thì lấy lại kết quả
+    with stage('cache_lookup'):
+        key = (content_hash(content), compiled.hash)
+        cached = result_cache.get(key)
+    if cached is not None:
+        return cached
+    with stage('tokenize'):
+        doc = load_nlp(compiled.needs_lemmas)(content)
+    with stage('evaluate'):
+        score, reasons = compiled.evaluate(content, doc)
+    result_cache.put(key, score, reasons)
+    return score, reasons
+
+# Chấm nhiều bài cùng lúc qua nlp.pipe (dùng cho regrade hàng loạt)
+# items: iterable các cặp (content, key) -> yield (key, score, reasons)
+# Bài có sẵn trong cache kết quả được trả về ngay nên thứ tự có thể khác thứ tự đầu vào
+def grade_essays(items, criteria_json, batch_size=64, n_process=1, essay_id=None, criteria_hash=None):
+    try:
+        compiled = criteria_cache.get(criteria_json, essay_id, criteria_hash)
+    except CriteriaError:
+        for _, key in items:
+            yield key, 0, ["Lỗi tiêu chí"]
+        return
+    if not compiled.needs_doc:
+        for content, key in items:
+            score, reasons = compiled.evaluate(content)
+            yield key, score, reasons
+        return
+    hits = deque()
+
+    def misses():
+        for content, key in items:
+            cache_key = (content_hash(content), compiled.hash)
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                hits.append((key, cached[0], cached[1]))
+            else:
+                yield content, (key, cache_key)
+
+    nlp = load_nlp(compiled.needs_lemmas)
+    for doc, (key, cache_key) in nlp.pipe(misses(), as_tuples=True, batch_size=batch_size, n_process=n_process):
+        while hits:
+            yield hits.popleft()
+        with stage('evaluate'):
+            score, reasons = compiled.evaluate(doc.text, doc)
+        result_cache.put(cache_key, score, reasons)
+        yield key, score, reasons
+    while hits:
+        yield hits.popleft()
+
+# Xóa bộ tiêu chí đã biên dịch của 1 đề (gọi khi sửa/xóa đề)
+def invalidate_criteria(essay_id):
+    criteria_cache.invalidate(essay_id)
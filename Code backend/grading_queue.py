@@ -0,0 +1,142 @@
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+# Hàng đợi chấm điểm: bài nộp được lưu trước, worker chấm sau (không chặn request)
+# handler(submission_id) do app.py cung cấp, chạy trong app context của Flask
+class GradingQueue:
+    def __init__(self, handler=None, workers=2, max_retries=2, retry_delay=0.5, max_jobs=10000):
+        self.handler = handler
+        self.app = None
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_jobs = max_jobs
+        self._queue = queue.Queue()
+        self._jobs = OrderedDict()
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._local = threading.local()
+        self.running = 0
+
+    def init_app(self, app, handler=None):
+        self.app = app
+        if handler is not None:
+            self.handler = handler
+        self.workers = app.config.get('GRADING_WORKERS', self.workers)
+        self.max_retries = app.config.get('GRADING_MAX_RETRIES', self.max_retries)
+        self.retry_delay = app.config.get('GRADING_RETRY_DELAY', self.retry_delay)
+
+    # Worker chỉ được khởi động khi có job đầu tiên (tránh chạy thừa trong process reloader)
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(max(1, int(self.workers))):
+                t = threading.Thread(target=self._worker, name=f'grading-worker-{i}', daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def enqueue(self, submission_id):
+        return self.submit(self.handler, submission_id, kind='grade', submission_id=submission_id)
+
+    # Đưa 1 tác vụ bất kỳ vào hàng đợi (vd. regrade cả đề), meta được trả về trong status
+    def submit(self, func, *args, kind='task', **meta):
+        job_id = uuid.uuid4().hex
+        job = {
+            'job_id': job_id,
+            'kind': kind,
+            **meta,
+            'status': 'queued',
+            'attempts': 0,
+            'progress': None,
+            'error': None,
+            'created_at': datetime.utcnow().isoformat(),
+            'finished_at': None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._tasks[job_id] = (func, args)
+            # Giới hạn bộ nhớ: bỏ các job cũ nhất đã xong
+            while len(self._jobs) > self.max_jobs:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if oldest['status'] in ('queued', 'running'):
+                    break
+                self._jobs.pop(oldest_id)
+        self.start()
+        self._queue.put(job_id)
+        return job_id
+
+    # Tác vụ đang chạy gọi hàm này để cập nhật tiến độ cho job của nó
+    def report_progress(self, **progress):
+        job_id = getattr(self._local, 'job_id', None)
+        if job_id:
+            self._update(job_id, progress=progress)
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def pending(self):
+        return self._queue.unfinished_tasks
+
+    # Số job đang chờ worker (chưa chạy)
+    def depth(self):
+        return max(0, self._queue.unfinished_tasks - self.running)
+
+    # Chờ tới khi hàng đợi rỗng (dùng cho benchmark / shutdown)
+    def join(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job.update(fields)
+            return job
+
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            with self._lock:
+                self.running += 1
+            try:
+                self._run_job(job_id)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                self._queue.task_done()
+
+    def _run_job(self, job_id):
+        job = self._update(job_id, status='running')
+        with self._lock:
+            func, args = self._tasks.pop(job_id, (None, ()))
+        if not job or func is None:
+            return
+        self._local.job_id = job_id
+        try:
+            # Thử lại khi lỗi (vd. "database is locked"), tối đa max_retries lần
+            for attempt in range(1, self.max_retries + 2):
+                self._update(job_id, attempts=attempt)
+                try:
+                    with self.app.app_context():
+                        result = func(*args)
+                    self._update(job_id, status='done', error=None, finished_at=datetime.utcnow().isoformat())
+                    return result
+                except Exception as e:
+                    self._update(job_id, error=str(e))
+                    if attempt <= self.max_retries:
+                        time.sleep(self.retry_delay * attempt)
+            self._update(job_id, status='failed', finished_at=datetime.utcnow().isoformat())
+        finally:
+            self._local.job_id = None
@@ -0,0 +1,40 @@
+import multiprocessing
+import os
+
+# Cấu hình gunicorn: gunicorn -c gunicorn.conf.py wsgi:app
+# Mọi giá trị đọc từ biến môi trường (xem README)
+bind = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+# Mỗi worker là 1 process riêng (chấm điểm chạy song song trên nhiều CPU, không bị GIL giới hạn)
+workers = int(os.environ.get('WEB_WORKERS', min(4, multiprocessing.cpu_count())))
+# Mỗi worker phục vụ nhiều request cùng lúc bằng thread (request chủ yếu chờ DB)
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+# Load app + model spaCy 1 lần trong master rồi mới fork (xem wsgi.py)
+preload_app = True
+# Recycle worker sau N request (+ ngẫu nhiên tới jitter để các worker không restart cùng lúc), 0 = tắt
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('WEB_MAX_REQUESTS_JITTER', 100))
+timeout = int(os.environ.get('WEB_TIMEOUT', 60))
+# Thời gian worker được chờ để xử lý xong request đang chạy + chấm nốt hàng đợi trước khi bị kill
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('WEB_KEEPALIVE', 5))
+accesslog = os.environ.get('WEB_ACCESS_LOG') or None
+
+# Bộ đệm nháp giữ version trong bộ nhớ của từng process; nhiều worker thì mặc định ghi thẳng xuống DB
+# Cache response trong bộ nhớ chỉ được invalidate ở worker nhận request ghi -> worker khác trả bản cũ tới hết TTL;
+# nhiều worker mà không có store chung (RESPONSE_CACHE_URL) thì mặc định tắt
+if workers > 1:
+    os.environ.setdefault('DRAFT_FLUSH_INTERVAL', '0')
+    if not os.environ.get('RESPONSE_CACHE_URL'):
+        os.environ.setdefault('RESPONSE_CACHE_ENABLED', '0')
+
+
+def post_fork(server, worker):
+    import wsgi
+    # age = thứ tự worker được sinh ra, 1 = worker đầu tiên lúc khởi động
+    wsgi.post_fork(first_worker=worker.age == 1)
+
+
+def worker_exit(server, worker):
+    import wsgi
+    wsgi.worker_exit(timeout=graceful_timeout)
@@ -0,0 +1,24 @@
+from flask import g
+from sqlalchemy import event
+
+# Đếm số câu SQL mỗi request (trả về qua header X-Query-Count) để phát hiện N+1 query
+def init_query_counter(app, db):
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        try:
+            g.query_count = g.get('query_count', 0) + 1
+        except RuntimeError:
+            # Ngoài app context (vd. script migrate) thì không đếm
+            pass
+
+    @app.after_request
+    def add_query_count_header(response):
+        response.headers['X-Query-Count'] = str(g.get('query_count', 0))
+        return response
+
+
+def query_count():
+    return g.get('query_count', 0)
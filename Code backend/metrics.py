@@ -0,0 +1,189 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request, has_request_context, Response
+from sqlalchemy import event
+
+# Bucket (giây) cho histogram độ trễ, đủ mịn cho cả stage vài trăm micro giây
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+# Histogram kiểu Prometheus: đếm số quan sát theo bucket (cộng dồn khi xuất), tổng và số lượng
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+# Nơi gom các histogram (theo tên + label), gauge và counter (hàm trả về số) để xuất ở /metrics
+# gauge: giá trị hiện tại (độ dài hàng đợi...); counter: tổng cộng dồn chỉ tăng (Prometheus tính rate() được),
+# tên counter theo quy ước kết thúc bằng _total
+class MetricsRegistry:
+    def __init__(self):
+        self._histograms = {}
+        self._help = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, help_text='', **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+                self._help.setdefault(name, help_text)
+            histogram.observe(value)
+
+    def gauge(self, name, func, help_text=''):
+        self._gauges[name] = (func, help_text, 'gauge')
+
+    def counter(self, name, func, help_text=''):
+        self._gauges[name] = (func, help_text, 'counter')
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            items = sorted(self._histograms.items())
+            seen = set()
+            for (name, labels), histogram in items:
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f'# HELP {name} {self._help.get(name, "")}')
+                    lines.append(f'# TYPE {name} histogram')
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels, le=bound)} {cumulative}')
+                lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {histogram.count}')
+                lines.append(f'{name}_sum{_labels(labels)} {histogram.sum:.6f}')
+                lines.append(f'{name}_count{_labels(labels)} {histogram.count}')
+        for name, (func, help_text, kind) in sorted(self._gauges.items()):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name} {func()}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+
+registry = MetricsRegistry()
+
+
+# Đo thời gian 1 giai đoạn chấm điểm (tokenize, evaluate, commit...) vào histogram grading_stage_seconds
+# Trong request thì cộng dồn vào g.stage_timings để trả về qua header Server-Timing
+@contextmanager
+def stage(name, metric='grading_stage_seconds'):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe(metric, elapsed, 'Duration of processing stages', stage=name)
+        if has_request_context():
+            timings = g.setdefault('stage_timings', {})
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+# Đăng ký đo độ trễ theo route, thời gian SQL, endpoint /metrics và profiler cho request chậm
+# PROFILE_SLOW_MS > 0 bật profiler: PROFILE_SAMPLE_RATE phần request được chạy dưới cProfile,
+# request nào chậm hơn ngưỡng thì ghi file .prof + bảng pstats (.txt) vào PROFILE_DIR
+def init_metrics(app, db):
+    with app.app_context():
+        engine = db.engine
+    slow_seconds = app.config.get('PROFILE_SLOW_MS', 0) / 1000
+    sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 1.0)
+    profile_dir = app.config.get('PROFILE_DIR', 'profiles')
+    # cProfile chỉ cho 1 profiler hoạt động tại 1 thời điểm -> mỗi lúc profile tối đa 1 request
+    profile_lock = threading.Lock()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        operation = statement.lstrip().split(' ', 1)[0].upper()
+        registry.observe('db_query_seconds', elapsed, 'Duration of SQL statements', operation=operation)
+        if has_request_context():
+            g.db_seconds = g.get('db_seconds', 0.0) + elapsed
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+        if slow_seconds > 0 and random.random() < sample_rate and profile_lock.acquire(blocking=False):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+        # Parse JSON sớm để tách thời gian parse khỏi thời gian xử lý (Flask cache lại kết quả)
+        if request.is_json:
+            with stage('parse_json', metric='request_stage_seconds'):
+                request.get_json(silent=True)
+
+    @app.after_request
+    def record_request(response):
+        start = g.get('request_start')
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        registry.observe('http_request_duration_seconds', elapsed, 'Duration of HTTP requests',
+                         method=request.method, route=route, status=response.status_code)
+        timings = dict(g.get('stage_timings', {}))
+        if 'db_seconds' in g:
+            timings['db'] = g.db_seconds
+        timings['total'] = elapsed
+        response.headers['Server-Timing'] = ', '.join(
+            f'{name};dur={seconds * 1000:.3f}' for name, seconds in timings.items()
+        )
+        return response
+
+    @app.teardown_request
+    def stop_profiler(exc):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        profile_lock.release()
+        elapsed = time.perf_counter() - g.request_start
+        if elapsed >= slow_seconds:
+            dump_profile(profiler, profile_dir, request.method, request.path, elapsed)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def dump_profile(profiler, profile_dir, method, path, elapsed):
+    os.makedirs(profile_dir, exist_ok=True)
+    name = f'{time.strftime("%Y%m%d-%H%M%S")}_{int(elapsed * 1000)}ms_{method}_{path.strip("/").replace("/", "_") or "root"}'
+    base = os.path.join(profile_dir, name)
+    profiler.dump_stats(base + '.prof')
+    text = io.StringIO()
+    pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(40)
+    with open(base + '.txt', 'w') as f:
+        f.write(f'{method} {path} {elapsed * 1000:.1f} ms\n')
+        f.write(text.getvalue())
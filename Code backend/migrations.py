@@ -0,0 +1,65 @@
+from sqlalchemy import inspect, text
+from models import db
+from score_stats import backfill_essay_stats
+from criteria_schema import upgrade_stored_criteria
+
+# Nâng cấp schema cho DB đã có sẵn (vd. instance/essay_grading.db cũ)
+# db.create_all() chỉ tạo bảng mới, không thêm index vào bảng đã tồn tại nên phải tạo riêng ở đây
+# Chạy được nhiều lần: cột/index nào có rồi thì bỏ qua
+def upgrade_schema(engine):
+    with engine.begin() as conn:
+        add_missing_columns(conn)
+        existing = {ix['name'] for ix in inspect(conn).get_indexes('essay_draft')}
+        if 'uq_essay_draft_essay_student' not in existing:
+            remove_duplicate_drafts(conn)
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        backfill_essay_stats(conn)
+        backfill_criteria(conn)
+
+# Thêm các cột mới khai báo trong models.py vào bảng cũ (cột mới phải nullable hoặc có server_default)
+def add_missing_columns(conn):
+    inspector = inspect(conn)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}'
+            if column.server_default is not None:
+                ddl += f" DEFAULT '{column.server_default.arg}'"
+                if not column.nullable:
+                    ddl += ' NOT NULL'
+            conn.execute(text(ddl))
+
+# Đề tạo trước khi có criteria_schema: chuẩn hóa criteria đã lưu và điền hash/phiên bản
+def backfill_criteria(conn):
+    rows = conn.execute(text('SELECT id, criteria FROM essay WHERE criteria_hash IS NULL')).fetchall()
+    for essay_id, criteria in rows:
+        stored, hash_, version = upgrade_stored_criteria(criteria)
+        conn.execute(text(
+            'UPDATE essay SET criteria = :criteria, criteria_hash = :hash, criteria_version = :version WHERE id = :id'
+        ), {'criteria': stored, 'hash': hash_, 'version': version, 'id': essay_id})
+
+# Giữ lại bản nháp mới nhất cho mỗi cặp (essay_id, student_id) trước khi tạo unique index
+def remove_duplicate_drafts(conn):
+    duplicates = conn.execute(text(
+        'SELECT essay_id, student_id FROM essay_draft GROUP BY essay_id, student_id HAVING COUNT(*) > 1'
+    )).fetchall()
+    for essay_id, student_id in duplicates:
+        ids = [row.id for row in conn.execute(text(
+            'SELECT id FROM essay_draft WHERE essay_id = :essay_id AND student_id = :student_id '
+            'ORDER BY last_saved DESC, id DESC'
+        ), {'essay_id': essay_id, 'student_id': student_id})]
+        for draft_id in ids[1:]:
+            conn.execute(text('DELETE FROM essay_draft WHERE id = :id'), {'id': draft_id})
+
+if __name__ == '__main__':
+    # python migrations.py -> nâng cấp DB theo DATABASE_URL (giống khi chạy app.py)
+    from app import app
+    with app.app_context():
+        upgrade_schema(db.engine)
+    print('Schema is up to date')
@@ -12,34 +12,82 @@ class User(db.Model):
 class Essay(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     question = db.Column(db.Text, nullable=False)
-    criteria = db.Column(db.Text, nullable=False)  # JSON string
-    teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    criteria = db.Column(db.Text, nullable=False)  # JSON string (đã chuẩn hóa, xem criteria_schema.py)
+    criteria_version = db.Column(db.Integer, nullable=True)  # SCHEMA_VERSION lúc ghi, 0 = dữ liệu cũ chưa hợp lệ
+    criteria_hash = db.Column(db.String(40), nullable=True)  # sha1 của criteria, key cache bộ tiêu chí đã biên dịch
+    teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     teacher = db.relationship('User', backref=db.backref('essays', lazy=True))
 
 class Submission(db.Model):
+    __table_args__ = (
+        db.Index('ix_submission_essay_student', 'essay_id', 'student_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     essay_id = db.Column(db.Integer, db.ForeignKey('essay.id'), nullable=False)
-    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     content = db.Column(db.Text, nullable=False)
     suggested_score = db.Column(db.Float)
     final_score = db.Column(db.Float)
     feedback = db.Column(db.Text)
+    # Thời điểm server nhận bài (trước khi chờ giới hạn tốc độ/chấm điểm), dùng để so với deadline
+    submitted_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
+    # Bài nộp đang chờ chấm tự động; job hàng đợi chỉ nằm trong bộ nhớ nên khởi động lại thì dựa vào cột này
+    # để đưa lại vào hàng đợi (bài import với ?grade=0 không chờ chấm)
+    grading_pending = db.Column(db.Boolean, nullable=False, default=False, server_default='0', index=True)
+    # Lần sửa nội dung gần nhất (None = chưa sửa), để index độ giống của các process khác đọc lại bài đã sửa
+    edited_at = db.Column(db.DateTime, nullable=True)
     essay = db.relationship('Essay', backref=db.backref('submissions', lazy=True))
     student = db.relationship('User', backref=db.backref('submissions', lazy=True), foreign_keys=[student_id])
 
 class Assignment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    essay_id = db.Column(db.Integer, db.ForeignKey('essay.id'), nullable=False)
-    teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    essay_id = db.Column(db.Integer, db.ForeignKey('essay.id'), nullable=False, index=True)
+    teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     deadline = db.Column(db.DateTime, nullable=True)  # Thêm trường deadline
     essay = db.relationship('Essay', backref=db.backref('assignments', lazy=True))
     teacher = db.relationship('User', backref=db.backref('assignments', lazy=True), foreign_keys=[teacher_id])
 
 class EssayDraft(db.Model):
+    # Mỗi học sinh chỉ có 1 bản nháp cho mỗi đề (unique index để migrate được cả DB SQLite cũ)
+    __table_args__ = (
+        db.Index('uq_essay_draft_essay_student', 'essay_id', 'student_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     essay_id = db.Column(db.Integer, db.ForeignKey('essay.id'), nullable=False)
     student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     content = db.Column(db.Text, nullable=True)
     last_saved = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # tăng mỗi lần lưu (dùng cho patch)
     essay = db.relationship('Essay', backref=db.backref('drafts', lazy=True))
-    student = db.relationship('User', backref=db.backref('drafts', lazy=True), foreign_keys=[student_id]) 
\ No newline at end of file
+    student = db.relationship('User', backref=db.backref('drafts', lazy=True), foreign_keys=[student_id]) 
+
+class GradingResult(db.Model):
+    # Cache kết quả chấm: key = (sha1 nội dung bài, sha1 tiêu chí), chỉ dùng khi engine_version khớp phiên bản hiện tại
+    content_hash = db.Column(db.String(40), primary_key=True)
+    criteria_hash = db.Column(db.String(40), primary_key=True)
+    engine_version = db.Column(db.String(120), nullable=True)  # ENGINE_VERSION/model spaCy lúc chấm
+    score = db.Column(db.Float, nullable=False)
+    reasons = db.Column(db.Text, nullable=False)  # JSON string
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+class EssayStats(db.Model):
+    # Thống kê điểm của 1 đề, cộng dồn mỗi khi bài nộp thay đổi điểm (xem score_stats.py)
+    essay_id = db.Column(db.Integer, db.ForeignKey('essay.id'), primary_key=True)
+    submission_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    suggested_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    suggested_sum = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    suggested_sumsq = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    final_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    final_sum = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    final_sumsq = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    # delta = final_score - suggested_score (chỉ tính bài có cả 2 điểm)
+    delta_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    delta_sum = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    delta_abs_sum = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class EssayScoreBucket(db.Model):
+    # Histogram điểm (final_score, chưa có thì suggested_score): bucket b = [b, b + 1), bucket cuối gồm cả 10
+    essay_id = db.Column(db.Integer, db.ForeignKey('essay.id'), primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
@@ -0,0 +1,100 @@
+import base64
+import binascii
+import json
+from flask import request, jsonify, Response, stream_with_context
+
+MAX_LIMIT = 1000
+STREAM_CHUNK = 500
+
+
+def encode_cursor(last_id):
+    raw = json.dumps({'id': last_id}).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return int(json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))['id'])
+
+
+# Trả về danh sách theo query string:
+#   fields=a,b  -> chỉ lấy các cột này từ DB (vd. bỏ `content` cho view danh sách)
+#   limit=N, cursor=... -> phân trang keyset theo id, trả về {'items': [...], 'next_cursor': ...}
+#   format=ndjson -> stream từng dòng JSON, bộ nhớ không tăng theo số dòng
+# Không có limit/cursor/format thì trả về mảng JSON như cũ
+# query_for(columns) dựng query với các cột cần lấy; fields: tên field -> cột; transforms: tên field -> hàm
+# raw_json: các field mà DB đã lưu sẵn JSON hợp lệ (vd. Essay.criteria) -> ghép thẳng vào output, không parse lại
+def list_response(query_for, fields, id_column, transforms=None, raw_json=()):
+    transforms = transforms or {}
+    args = request.args
+    names = list(fields)
+    if args.get('fields'):
+        names = [n.strip() for n in args['fields'].split(',') if n.strip()]
+        unknown = [n for n in names if n not in fields]
+        if unknown or not names:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    try:
+        limit = int(args['limit']) if 'limit' in args else None
+        after_id = decode_cursor(args['cursor']) if args.get('cursor') else None
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        return jsonify({'error': 'Invalid limit or cursor'}), 400
+    if limit is not None and not 1 <= limit <= MAX_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {MAX_LIMIT}'}), 400
+    stream = args.get('format') == 'ndjson'
+    paginate = limit is not None or 'cursor' in args
+
+    columns = [fields[n].label(n) for n in names] + [id_column.label('_cursor_id')]
+    query = query_for(columns).order_by(id_column)
+    if after_id is not None:
+        query = query.filter(id_column > after_id)
+
+    def serialize(row):
+        item = {}
+        for n in names:
+            value = getattr(row, n)
+            item[n] = transforms[n](value) if n in transforms and value is not None else value
+        return item
+
+    raw_names = [n for n in names if n in raw_json]
+
+    def dump(row):
+        if not raw_names:
+            return json.dumps(serialize(row), ensure_ascii=False)
+        item = {n: getattr(row, n) for n in names if n not in raw_json}
+        for n in item:
+            if n in transforms and item[n] is not None:
+                item[n] = transforms[n](item[n])
+        raw = ','.join(f'{json.dumps(n)}:{getattr(row, n) or "null"}' for n in raw_names)
+        head = json.dumps(item, ensure_ascii=False)[:-1]
+        return f'{head},{raw}}}' if item else f'{{{raw}}}'
+
+    def json_response(body):
+        return Response(body, mimetype='application/json')
+
+    next_cursor = None
+    if paginate:
+        limit = limit or MAX_LIMIT
+        rows = query.limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]._cursor_id)
+    else:
+        rows = None
+
+    if stream:
+        def generate():
+            source = rows if rows is not None else query.yield_per(STREAM_CHUNK)
+            for row in source:
+                yield dump(row) + '\n'
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+    if raw_names:
+        items = '[' + ','.join(dump(row) for row in (rows if paginate else query.all())) + ']'
+        if paginate:
+            return json_response(f'{{"items":{items},"next_cursor":{json.dumps(next_cursor)}}}')
+        return json_response(items)
+    if paginate:
+        return jsonify({'items': [serialize(row) for row in rows], 'next_cursor': next_cursor})
+    return jsonify([serialize(row) for row in query.all()])
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from flask import request, make_response, Response
+
+
+# Store trong bộ nhớ process: LRU giới hạn theo số entry và tổng số byte, entry hết hạn sau ttl giây
+# Bộ đếm phiên bản (incr) để riêng, không bị LRU đẩy ra
+class MemoryStore:
+    def __init__(self, maxsize=1000, max_bytes=64 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (bytes, hết hạn lúc)
+        self._counters = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] is not None and entry[1] < time.monotonic():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        if self.maxsize <= 0 or len(value) > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (value, time.monotonic() + ttl if ttl else None)
+            self._bytes += len(value)
+            while len(self._entries) > self.maxsize or self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def mget(self, keys):
+        with self._lock:
+            counters = [self._counters.get(key) for key in keys]
+        return [value if value is not None else self.get(key) for key, value in zip(keys, counters)]
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+            self._bytes = 0
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Store dùng chung giữa các process qua client kiểu Redis (redis-py hoặc bản thay thế cùng API:
+# get/set(ex=)/mget/incr), vd. khi chạy nhiều worker để xóa cache ở 1 worker có hiệu lực cho tất cả
+class RedisStore:
+    def __init__(self, client, prefix='essay-grading:'):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url):
+        import redis
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=int(ttl) if ttl else None)
+
+    def mget(self, keys):
+        return [int(v) if v is not None else None for v in self.client.mget([self.prefix + k for k in keys])]
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+# Cache response của các route GET chỉ đọc, kèm ETag/Last-Modified và trả 304 khi client đã có bản mới nhất
+# Mỗi route khai báo các tag dữ liệu nó phụ thuộc (vd. 'essays', 'essay:{essay_id}'); route ghi gọi
+# invalidate(tag) -> tăng phiên bản của tag, các entry cũ không còn được dùng (tự hết hạn theo ttl/LRU)
+# Phiên bản được đọc trước khi query DB nên request chạy song song với 1 lần ghi không lưu dữ liệu cũ
+# dưới phiên bản mới
+class ResponseCache:
+    def __init__(self, store=None, ttl=60, enabled=True):
+        self.store = store or MemoryStore()
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', self.enabled)
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', self.ttl)
+        url = app.config.get('RESPONSE_CACHE_URL')
+        if url:
+            self.store = RedisStore.from_url(url)
+        else:
+            self.store = MemoryStore(app.config.get('RESPONSE_CACHE_SIZE', 1000),
+                                     app.config.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            self.store.incr('gen:' + tag)
+
+    def cached(self, *tags):
+        def decorator(f):
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method != 'GET':
+                    return f(*args, **kwargs)
+                names = [t.format(**kwargs) for t in tags]
+                versions = self.store.mget(['gen:' + n for n in names])
+                key = 'resp:' + request.full_path + '|' + ','.join(str(v or 0) for v in versions)
+                raw = self.store.get(key)
+                if raw is None:
+                    response = make_response(f(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed:
+                        return response
+                    body = response.get_data()
+                    meta = {
+                        'etag': hashlib.sha1(body).hexdigest(),
+                        'last_modified': time.time(),
+                        'mimetype': response.mimetype,
+                    }
+                    self.store.set(key, json.dumps(meta).encode('utf-8') + b'\n' + body, self.ttl)
+                    self._count('misses')
+                else:
+                    header, body = raw.split(b'\n', 1)
+                    meta = json.loads(header)
+                    self._count('hits')
+                response = Response(body, mimetype=meta['mimetype'])
+                response.set_etag(meta['etag'])
+                response.last_modified = datetime.fromtimestamp(int(meta['last_modified']), timezone.utc)
+                # Client luôn hỏi lại server (kèm If-None-Match) thay vì tự dùng bản cũ
+                response.headers['Cache-Control'] = 'no-cache'
+                response.headers['X-Cache'] = 'HIT' if raw is not None else 'MISS'
+                response.make_conditional(request)
+                if response.status_code == 304:
+                    self._count('not_modified')
+                return response
+            wrapper.__name__ = f.__name__
+            return wrapper
+        return decorator
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'backend': type(self.store).__name__,
+            }
+
+    def clear(self):
+        self.store.clear()
+        with self._lock:
+            self.hits = self.misses = self.not_modified = 0
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import select, insert, update, delete, or_
+from sqlalchemy.exc import IntegrityError
+
+
+def content_hash(content):
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+# Lưu kết quả chấm vào bảng SQL (model GradingResult) để cache còn sau khi khởi động lại
+# version = phiên bản cách chấm + model spaCy: dòng của phiên bản khác coi như chưa có và bị ghi đè/dọn dần
+# Bảng giữ tối đa max_rows dòng: cứ prune_every lần ghi thì xóa dòng phiên bản cũ và dòng cũ nhất vượt giới hạn
+class SQLResultStore:
+    def __init__(self, db, model, version, max_rows=100000, prune_every=1000):
+        self.db = db
+        self.table = model.__table__
+        self.version = version
+        self.max_rows = max_rows
+        self.prune_every = prune_every
+        self._puts = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        t = self.table
+        with self.db.engine.connect() as conn:
+            row = conn.execute(select(t.c.score, t.c.reasons).where(
+                t.c.content_hash == key[0], t.c.criteria_hash == key[1], t.c.engine_version == self.version
+            )).first()
+        if row is None:
+            return None
+        return row.score, json.loads(row.reasons)
+
+    def put(self, key, score, reasons):
+        t = self.table
+        values = {'engine_version': self.version, 'score': score, 'reasons': json.dumps(reasons),
+                  'created_at': datetime.utcnow()}
+        try:
+            # Dùng connection riêng để không commit lẫn session của request
+            with self.db.engine.begin() as conn:
+                conn.execute(insert(t).values(content_hash=key[0], criteria_hash=key[1], **values))
+        except IntegrityError:
+            # Đã có dòng của phiên bản cũ -> thay bằng kết quả mới (cùng phiên bản thì giữ nguyên)
+            with self.db.engine.begin() as conn:
+                conn.execute(update(t).where(
+                    t.c.content_hash == key[0], t.c.criteria_hash == key[1],
+                    or_(t.c.engine_version.is_(None), t.c.engine_version != self.version),
+                ).values(**values))
+        with self._lock:
+            self._puts += 1
+            due = self.prune_every > 0 and self._puts % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def prune(self):
+        t = self.table
+        with self.db.engine.begin() as conn:
+            conn.execute(delete(t).where(or_(t.c.engine_version.is_(None), t.c.engine_version != self.version)))
+            if self.max_rows > 0:
+                cutoff = conn.execute(
+                    select(t.c.created_at).order_by(t.c.created_at.desc()).offset(self.max_rows).limit(1)
+                ).scalar()
+                if cutoff is not None:
+                    conn.execute(delete(t).where(t.c.created_at <= cutoff))
+
+
+# Cache kết quả chấm theo (hash nội dung, hash tiêu chí): LRU trong bộ nhớ + store tùy chọn
+class GradingResultCache:
+    def __init__(self, maxsize=10000, store=None):
+        self.maxsize = maxsize
+        self.store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def configure(self, maxsize=None, store=None):
+        if maxsize is not None:
+            self.maxsize = maxsize
+        self.store = store
+        self.clear()
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result[0], list(result[1])
+        if self.store is not None:
+            result = self.store.get(key)
+            if result is not None:
+                with self._lock:
+                    self.store_hits += 1
+                self._remember(key, result)
+                return result[0], list(result[1])
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, score, reasons):
+        self._remember(key, (score, tuple(reasons)))
+        if self.store is not None:
+            self.store.put(key, score, list(reasons))
+
+    def _remember(self, key, result):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (result[0], tuple(result[1]))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.store_hits + self.misses
+            return {
+                'hits': self.hits,
+                'store_hits': self.store_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.store_hits) / lookups, 4) if lookups else None,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'persistent': self.store is not None,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.store_hits = self.misses = 0
+
+
+result_cache = GradingResultCache()
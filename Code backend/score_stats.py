@@ -0,0 +1,205 @@
+import math
+from datetime import datetime
+from sqlalchemy import select, update, delete, insert, func, case, and_, text
+from models import Submission, EssayStats, EssayScoreBucket
+
+# Thống kê điểm theo đề được lưu sẵn (bảng essay_stats + essay_score_bucket) và cộng/trừ
+# mỗi khi 1 bài nộp đổi điểm, nên đọc thống kê chỉ tốn 2 câu query dù đề có bao nhiêu bài
+# conn: db.session hoặc Connection (cùng transaction với thay đổi của bài nộp)
+NUM_BUCKETS = 10
+STAT_FIELDS = (
+    'submission_count',
+    'suggested_count', 'suggested_sum', 'suggested_sumsq',
+    'final_count', 'final_sum', 'final_sumsq',
+    'delta_count', 'delta_sum', 'delta_abs_sum',
+)
+
+stats_table = EssayStats.__table__
+buckets_table = EssayScoreBucket.__table__
+
+
+def score_bucket(score):
+    return min(NUM_BUCKETS - 1, max(0, int(math.floor(score))))
+
+
+# Điểm của bài nộp dưới dạng (suggested_score, final_score), None nếu bài không tồn tại
+def submission_scores(submission):
+    if submission is None:
+        return None
+    return submission.suggested_score, submission.final_score
+
+
+# Phần đóng góp của 1 bài nộp vào các cột thống kê + bucket histogram của nó
+def contribution(scores):
+    if scores is None:
+        return {}, None
+    suggested, final = (float(score) if score is not None else None for score in scores)
+    values = {'submission_count': 1}
+    if suggested is not None:
+        values.update(suggested_count=1, suggested_sum=suggested, suggested_sumsq=suggested * suggested)
+    if final is not None:
+        values.update(final_count=1, final_sum=final, final_sumsq=final * final)
+    if suggested is not None and final is not None:
+        delta = final - suggested
+        values.update(delta_count=1, delta_sum=delta, delta_abs_sum=abs(delta))
+    effective = final if final is not None else suggested
+    return values, score_bucket(effective) if effective is not None else None
+
+
+# Sửa điểm (và các cột khác trong values, vd. feedback) của 1 bài nộp + cộng thống kê trong cùng transaction
+# Điểm cũ đọc từ trước (vd. trước khi chấm) có thể đã bị worker/request khác chấm cùng bài đổi mất -> UPDATE có
+# điều kiện "điểm vẫn như đã đọc"; không khớp dòng nào thì đọc lại điểm hiện tại (transaction đã giữ quyền ghi)
+# rồi thử lại, nên thay đổi của bài không bị cộng vào thống kê 2 lần
+# auto_feedback: nhận xét tự động, chỉ ghi khi bài chưa có final_score (đã chấm thì feedback là của giáo viên)
+def set_submission_scores(session, submission, auto_feedback=None, **values):
+    while True:
+        old = submission_scores(submission)
+        row_values = dict(values)
+        if auto_feedback is not None and old[1] is None:
+            row_values['feedback'] = auto_feedback
+        result = session.execute(update(Submission).where(
+            Submission.id == submission.id,
+            _unchanged(Submission.suggested_score, old[0]),
+            _unchanged(Submission.final_score, old[1]),
+        ).values(**row_values))
+        if result.rowcount:
+            break
+        session.refresh(submission)
+    record_score_change(session, submission.essay_id, old, submission_scores(submission))
+
+
+def _unchanged(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+# Ghi nhận 1 bài nộp đổi điểm: old/new là kết quả submission_scores trước và sau khi sửa
+def record_score_change(conn, essay_id, old, new):
+    record_score_changes(conn, essay_id, [(old, new)])
+
+
+# Ghi nhận nhiều thay đổi của cùng 1 đề (vd. import hàng loạt) bằng 1 UPDATE thống kê + mỗi bucket 1 UPDATE
+# Dùng UPDATE cột = cột + delta nên các request đồng thời không ghi đè lên nhau
+def record_score_changes(conn, essay_id, changes):
+    totals = dict.fromkeys(STAT_FIELDS, 0)
+    bucket_deltas = {}
+    for old, new in changes:
+        old_values, old_bucket = contribution(old)
+        new_values, new_bucket = contribution(new)
+        for field in STAT_FIELDS:
+            totals[field] += new_values.get(field, 0) - old_values.get(field, 0)
+        if old_bucket != new_bucket:
+            for bucket, diff in ((old_bucket, -1), (new_bucket, 1)):
+                if bucket is not None:
+                    bucket_deltas[bucket] = bucket_deltas.get(bucket, 0) + diff
+    deltas = {stats_table.c[field]: stats_table.c[field] + diff for field, diff in totals.items() if diff}
+    bucket_deltas = {bucket: diff for bucket, diff in bucket_deltas.items() if diff}
+    if not deltas and not bucket_deltas:
+        return
+    deltas[stats_table.c.updated_at] = datetime.utcnow()
+    result = conn.execute(update(stats_table).where(stats_table.c.essay_id == essay_id).values(deltas))
+    if result.rowcount == 0:
+        # Đề chưa có dòng thống kê (DB cũ chưa migrate): tính lại từ đầu, đã gồm thay đổi hiện tại
+        rebuild_essay_stats(conn, essay_id)
+        return
+    for bucket, diff in sorted(bucket_deltas.items()):
+        conn.execute(update(buckets_table).where(
+            buckets_table.c.essay_id == essay_id, buckets_table.c.bucket == bucket
+        ).values(count=buckets_table.c.count + diff))
+
+
+# Tính lại thống kê của 1 đề bằng 2 câu aggregate (dùng khi tạo đề, migrate DB cũ, sau regrade hàng loạt)
+def rebuild_essay_stats(conn, essay_id):
+    s = Submission.__table__.c
+    both = and_(s.suggested_score.isnot(None), s.final_score.isnot(None))
+    delta = s.final_score - s.suggested_score
+    row = conn.execute(select(
+        func.count(),
+        func.count(s.suggested_score),
+        func.coalesce(func.sum(s.suggested_score), 0),
+        func.coalesce(func.sum(s.suggested_score * s.suggested_score), 0),
+        func.count(s.final_score),
+        func.coalesce(func.sum(s.final_score), 0),
+        func.coalesce(func.sum(s.final_score * s.final_score), 0),
+        func.coalesce(func.sum(case((both, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((both, delta), else_=0)), 0),
+        func.coalesce(func.sum(case((both, func.abs(delta)), else_=0)), 0),
+    ).where(s.essay_id == essay_id)).one()
+    effective = func.coalesce(s.final_score, s.suggested_score)
+    bucket = case(*[(effective < b + 1, b) for b in range(NUM_BUCKETS - 1)], else_=NUM_BUCKETS - 1)
+    counts = dict(conn.execute(
+        select(bucket.label('bucket'), func.count())
+        .where(s.essay_id == essay_id, effective.isnot(None))
+        .group_by(text('bucket'))
+    ).all())
+
+    conn.execute(delete(stats_table).where(stats_table.c.essay_id == essay_id))
+    conn.execute(delete(buckets_table).where(buckets_table.c.essay_id == essay_id))
+    conn.execute(insert(stats_table).values(
+        essay_id=essay_id, updated_at=datetime.utcnow(), **dict(zip(STAT_FIELDS, row))
+    ))
+    conn.execute(insert(buckets_table), [
+        {'essay_id': essay_id, 'bucket': b, 'count': counts.get(b, 0)} for b in range(NUM_BUCKETS)
+    ])
+
+
+def delete_essay_stats(conn, essay_id):
+    conn.execute(delete(stats_table).where(stats_table.c.essay_id == essay_id))
+    conn.execute(delete(buckets_table).where(buckets_table.c.essay_id == essay_id))
+
+
+# Tạo thống kê cho các đề chưa có (DB cũ), chạy 1 lần trong upgrade_schema
+def backfill_essay_stats(conn):
+    missing = conn.execute(text(
+        'SELECT id FROM essay WHERE id NOT IN (SELECT essay_id FROM essay_stats)'
+    )).fetchall()
+    for (essay_id,) in missing:
+        rebuild_essay_stats(conn, essay_id)
+
+
+def _moments(count, total, total_sq):
+    if not count:
+        return None, None
+    mean = total / count
+    # Phương sai tổng thể, tránh số âm nhỏ do sai số làm tròn
+    variance = max(0.0, total_sq / count - mean * mean)
+    return mean, variance
+
+
+# Đọc thống kê đã lưu của 1 đề; None nếu đề chưa có dòng thống kê
+def read_essay_stats(conn, essay_id, pass_score):
+    stats = conn.execute(select(stats_table).where(stats_table.c.essay_id == essay_id)).first()
+    if stats is None:
+        return None
+    counts = dict(conn.execute(
+        select(buckets_table.c.bucket, buckets_table.c.count).where(buckets_table.c.essay_id == essay_id)
+    ).all())
+    histogram = [counts.get(b, 0) for b in range(NUM_BUCKETS)]
+    scored = sum(histogram)
+    suggested_mean, suggested_variance = _moments(stats.suggested_count, stats.suggested_sum, stats.suggested_sumsq)
+    final_mean, final_variance = _moments(stats.final_count, stats.final_sum, stats.final_sumsq)
+    passed = sum(histogram[score_bucket(pass_score):]) if pass_score < NUM_BUCKETS else 0
+    return {
+        'essay_id': essay_id,
+        'submission_count': stats.submission_count,
+        'graded_count': stats.suggested_count,
+        'reviewed_count': stats.final_count,
+        'suggested': {
+            'mean': suggested_mean,
+            'variance': suggested_variance,
+            'stddev': math.sqrt(suggested_variance) if suggested_variance is not None else None,
+        },
+        'final': {
+            'mean': final_mean,
+            'variance': final_variance,
+            'stddev': math.sqrt(final_variance) if final_variance is not None else None,
+        },
+        'delta': {
+            'count': stats.delta_count,
+            'mean': stats.delta_sum / stats.delta_count if stats.delta_count else None,
+            'mean_abs': stats.delta_abs_sum / stats.delta_count if stats.delta_count else None,
+        },
+        'histogram': [{'min': b, 'max': b + 1, 'count': count} for b, count in enumerate(histogram)],
+        'pass_score': pass_score,
+        'pass_rate': passed / scored if scored else None,
+        'updated_at': stats.updated_at.isoformat() if stats.updated_at else None,
+    }
@@ -0,0 +1,139 @@
+import re
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+from scipy import sparse
+
+# Phát hiện bài giống nhau trong cùng 1 đề: mỗi bài -> vector TF-IDF của các cụm k từ liên tiếp
+# (shingle, băm vào N_FEATURES chiều), độ giống = cosine; cả lớp tính bằng 1 phép nhân ma trận thưa
+N_FEATURES = 1 << 20
+WORD_RE = re.compile(r'\w+')
+_MIX = np.uint64(0x9E3779B1)
+
+
+# Băm các shingle k từ của 1 bài -> (chỉ số feature, trọng số tf) dạng mảng numpy
+def shingle_features(content, k=3):
+    tokens = WORD_RE.findall(content.lower())
+    if not tokens:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+    hashes = np.fromiter((zlib.crc32(t.encode('utf-8')) for t in tokens), dtype=np.uint64, count=len(tokens))
+    k = min(k, len(hashes))
+    combined = hashes[:len(hashes) - k + 1].copy()
+    for offset in range(1, k):
+        combined = combined * _MIX + hashes[offset:len(hashes) - k + 1 + offset]
+    features, counts = np.unique(combined % np.uint64(N_FEATURES), return_counts=True)
+    # tf dạng log để bài dài lặp lại 1 cụm nhiều lần không lấn át
+    return features.astype(np.int32), (1 + np.log(counts)).astype(np.float32)
+
+
+class EssayIndex:
+    def __init__(self, shingle_size):
+        self.shingle_size = shingle_size
+        self.positions = {}  # submission id -> dòng trong ma trận
+        self.ids = []
+        self.students = []
+        self.rows = []  # (features, tf) của từng bài
+        self.loaded_id = 0  # id lớn nhất đã đọc từ DB
+        self.edited_at = None  # thời điểm sửa bài muộn nhất đã đọc từ DB
+        self._matrix = None
+
+    def add(self, submission_id, student_id, content):
+        features = shingle_features(content or '', self.shingle_size)
+        position = self.positions.get(submission_id)
+        if position is None:
+            self.positions[submission_id] = len(self.ids)
+            self.ids.append(submission_id)
+            self.students.append(student_id)
+            self.rows.append(features)
+        else:
+            self.rows[position] = features
+        self._matrix = None
+
+    # Ma trận TF-IDF đã chuẩn hóa L2 (n bài x N_FEATURES), chỉ dựng lại khi có bài mới/sửa
+    def matrix(self):
+        if self._matrix is None:
+            lengths = np.fromiter((len(f) for f, _ in self.rows), dtype=np.int64, count=len(self.rows))
+            indptr = np.concatenate(([0], np.cumsum(lengths)))
+            indices = np.concatenate([f for f, _ in self.rows]) if self.rows else np.empty(0, dtype=np.int32)
+            data = np.concatenate([w for _, w in self.rows]) if self.rows else np.empty(0, dtype=np.float32)
+            n = len(self.rows)
+            df = np.bincount(indices, minlength=N_FEATURES)
+            idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+            data = data * idf[indices]
+            row_of = np.repeat(np.arange(n), lengths)
+            norms = np.sqrt(np.bincount(row_of, weights=data * data, minlength=n))
+            norms[norms == 0] = 1
+            data = (data / norms[row_of]).astype(np.float32)
+            self._matrix = sparse.csr_matrix((data, indices, indptr), shape=(n, N_FEATURES))
+        return self._matrix
+
+    # Các cặp bài của 2 học sinh khác nhau có cosine >= threshold, giống nhất trước
+    # (bài nộp lại/bài cũ của cùng 1 học sinh không tính là giống nhau)
+    def similar_pairs(self, threshold, limit):
+        if len(self.ids) < 2:
+            return []
+        matrix = self.matrix()
+        scores = sparse.triu(matrix @ matrix.T, k=1).tocoo()
+        students = np.asarray(self.students)
+        keep = (scores.data >= threshold) & (students[scores.row] != students[scores.col])
+        rows, cols, values = scores.row[keep], scores.col[keep], scores.data[keep]
+        order = np.argsort(-values, kind='stable')[:limit]
+        return [{
+            'submission_a': self.ids[rows[i]],
+            'student_a': self.students[rows[i]],
+            'submission_b': self.ids[cols[i]],
+            'student_b': self.students[cols[i]],
+            'similarity': round(float(min(values[i], 1.0)), 4),
+        } for i in order]
+
+
+# Giữ index của tối đa max_essays đề trong bộ nhớ (LRU); đề chưa có index được dựng từ DB khi cần
+# load_rows(essay_id, after_id, edited_since) do app.py cung cấp: trả về (id, student_id, content, edited_at)
+# của bài có id > after_id hoặc được sửa sau edited_since (None = mọi bài đã sửa)
+# Mỗi lần truy vấn chỉ đọc thêm bài mới/bài vừa sửa (kể cả do process khác ghi) nên index luôn cập nhật dần
+class SimilarityIndex:
+    def __init__(self, shingle_size=3, max_essays=50):
+        self.shingle_size = shingle_size
+        self.max_essays = max_essays
+        self.load_rows = None
+        self._essays = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app, load_rows):
+        self.shingle_size = app.config.get('SIMILARITY_SHINGLE_SIZE', self.shingle_size)
+        self.max_essays = app.config.get('SIMILARITY_MAX_ESSAYS', self.max_essays)
+        self.load_rows = load_rows
+
+    # Gọi khi có bài nộp mới/sửa nội dung; đề chưa được nạp thì bỏ qua (sẽ đọc từ DB khi cần)
+    def add(self, essay_id, submission_id, student_id, content):
+        with self._lock:
+            index = self._essays.get(essay_id)
+            if index is not None:
+                index.add(submission_id, student_id, content)
+
+    def discard(self, essay_id):
+        with self._lock:
+            self._essays.pop(essay_id, None)
+
+    def similar_pairs(self, essay_id, threshold, limit):
+        with self._lock:
+            index = self._essays.get(essay_id)
+            if index is None:
+                index = self._essays[essay_id] = EssayIndex(self.shingle_size)
+            self._essays.move_to_end(essay_id)
+            while len(self._essays) > self.max_essays:
+                self._essays.popitem(last=False)
+            edited_since = index.edited_at
+            rows = self.load_rows(essay_id, index.loaded_id, edited_since)
+            for submission_id, student_id, content, edited_at in rows:
+                edited = edited_at is not None and (edited_since is None or edited_at > edited_since)
+                if submission_id not in index.positions or edited:
+                    index.add(submission_id, student_id, content)
+                index.loaded_id = max(index.loaded_id, submission_id)
+                if edited_at is not None and (index.edited_at is None or edited_at > index.edited_at):
+                    index.edited_at = edited_at
+            return len(index.ids), index.similar_pairs(threshold, limit)
+
+
+similarity_index = SimilarityIndex()
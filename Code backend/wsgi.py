@@ -0,0 +1,48 @@
+import gc
+import os
+from app import app, grading_queue, recover_pending_grading
+from models import db
+from grading import load_nlp
+from draft_buffer import draft_buffer
+from auth import DEV_SECRET_KEY
+
+# Entry point cho chạy production: gunicorn -c gunicorn.conf.py wsgi:app
+# (app.py + app.run(debug=True) chỉ dùng khi phát triển)
+# Với preload_app, module này được import 1 lần trong master process trước khi fork worker:
+# model spaCy được load ở đây nên các worker dùng chung trang nhớ (copy-on-write) thay vì mỗi worker load 1 bản
+PRELOAD_NLP = os.environ.get('PRELOAD_NLP', '1') == '1'
+# Đề có rule lemma_contains cần thêm pipeline có lemmatizer (nặng hơn), chỉ preload khi bật
+PRELOAD_LEMMAS = os.environ.get('PRELOAD_LEMMAS', '0') == '1'
+
+
+def preload():
+    # Khóa mặc định ai cũng biết -> ai cũng ký được token đăng nhập; production bắt buộc đặt SECRET_KEY
+    if app.config['SECRET_KEY'] == DEV_SECRET_KEY:
+        raise RuntimeError('SECRET_KEY must be set to a private value before starting the production server')
+    if PRELOAD_NLP:
+        load_nlp()
+        if PRELOAD_LEMMAS:
+            load_nlp(lemmas=True)
+    # Đưa các object đã có vào vùng GC "đóng băng": GC của worker không ghi vào header các object này,
+    # trang nhớ của model không bị copy sau fork
+    gc.collect()
+    gc.freeze()
+
+
+# Gọi trong worker ngay sau fork: connection DB mở trong master (create_all, migrations) không được
+# dùng chung giữa các process -> bỏ pool cũ (không đóng socket của master), worker tự mở connection mới
+# Sau đó đưa lại vào hàng đợi các bài chờ chấm bị mất khi server/worker trước dừng: worker đầu tiên lúc
+# server khởi động lấy hết, worker sinh ra sau (recycle, thay worker bị kill) chỉ lấy bài chờ quá GRADING_RECOVER_AGE
+def post_fork(first_worker=False):
+    with app.app_context():
+        db.engine.dispose(close=False)
+        recover_pending_grading(0 if first_worker else app.config['GRADING_RECOVER_AGE'])
+
+
+# Worker dừng (recycle theo max_requests, reload, SIGTERM): chấm nốt các bài đã nhận và ghi nháp còn trong bộ nhớ
+def worker_exit(timeout=None):
+    grading_queue.join(timeout=timeout)
+    draft_buffer.shutdown()
+
+
+preload()